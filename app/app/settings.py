@@ -31,7 +31,8 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    # Admin modules are discovered by the URLconf instead of at start up
+    "django.contrib.admin.apps.SimpleAdminConfig",
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -45,6 +46,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.SlowQueryMiddleware",
+    "core.middleware.ReplicaMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,9 +89,29 @@ DATABASES = {
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
+        # Keep connections open between requests, checking them on reuse
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
     }
 }
 
+# Check persistent connections before a request reuses them
+DB_HEALTH_CHECK = bool(int(os.environ.get("DB_HEALTH_CHECK", 1)))
+
+# Read replicas sharing the primary's credentials, as comma separated hosts.
+# Safe requests read from a replica unless their user wrote in the last
+# REPLICA_PIN_SECONDS, so users always see their own changes.
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+    filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(","))
+):
+    DATABASES[f"replica_{index}"] = dict(
+        DATABASES["default"], HOST=host, TEST={"MIRROR": "default"}
+    )
+    DATABASE_REPLICAS.append(f"replica_{index}")
+
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -131,4 +155,90 @@ MEDIA_URL = "/media/"
 STATIC_ROOT = "/vol/web/static"
 MEDIA_ROOT = "/vol/web/media"
 
+# Hand media transfers to the front proxy: "x-accel-redirect" (nginx) or
+# "x-sendfile" (Apache, lighttpd); files are streamed by Django when unset
+MEDIA_ACCEL = os.environ.get("MEDIA_ACCEL")
+MEDIA_ACCEL_PREFIX = os.environ.get("MEDIA_ACCEL_PREFIX", "/protected-media/")
+
 AUTH_USER_MODEL = "core.User"
+
+RECIPE_IMAGE_VARIANT_SIZES = (128, 512, 1024)
+RECIPE_EXPORT_CHUNK_SIZE = 500
+# Most items one bulk request may create, update or delete
+RECIPE_BULK_MAX_ITEMS = int(os.environ.get("RECIPE_BULK_MAX_ITEMS", 1000))
+# Upper bounds of the price ranges counted in the recipe statistics; run
+# rebuild_recipe_stats after changing them
+RECIPE_STATS_PRICE_RANGES = (5, 10, 20, 50)
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.environ.get("RECIPE_IMAGE_MAX_BYTES", 10 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.environ.get("RECIPE_IMAGE_MAX_PIXELS", 40 * 1000 * 1000)
+)
+
+REST_FRAMEWORK = {
+    "PAGE_SIZE": int(os.environ.get("API_PAGE_SIZE", 100)),
+}
+
+# User data versions, cached responses and token lookups must be shared by
+# the web and worker processes, so deployments point CACHE_LOCATION at their
+# memcached servers; the local memory cache only suits a single process
+CACHE_LOCATION = os.environ.get("CACHE_LOCATION", "")
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND",
+            "django.core.cache.backends.memcached.MemcachedCache"
+            if CACHE_LOCATION
+            else "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": CACHE_LOCATION,
+    }
+}
+
+# Cache for per-user responses, must be shared by all worker processes
+USER_CACHE_ALIAS = "default"
+USER_CACHE_TIMEOUT = int(os.environ.get("USER_CACHE_TIMEOUT", 3600))
+
+# Token lookups are kept in the shared CACHE_ALIAS, so a deleted token or
+# deactivated user is rejected by every process at once. With an empty alias
+# each process keeps an LRU of MAX_SIZE entries instead, and other processes
+# keep accepting a revoked token for up to TTL seconds.
+TOKEN_AUTH_CACHE = {
+    "MAX_SIZE": int(os.environ.get("TOKEN_AUTH_CACHE_SIZE", 1024)),
+    "TTL": int(os.environ.get("TOKEN_AUTH_CACHE_TTL", 300)),
+    "CACHE_ALIAS": os.environ.get("TOKEN_AUTH_CACHE_ALIAS", "default"),
+}
+
+# Prometheus metrics served at /metrics; worker processes of a host share
+# their values through DIRECTORY, and TOKEN requires a bearer token
+METRICS = {
+    "DIRECTORY": os.environ.get("METRICS_DIRECTORY"),
+    "FLUSH_INTERVAL": 5,
+    # Seconds after which a process's saved values are folded into totals
+    "STALE_AFTER": int(os.environ.get("METRICS_STALE_AFTER", 300)),
+    "TOKEN": os.environ.get("METRICS_TOKEN"),
+}
+
+# Log queries slower than THRESHOLD seconds with their EXPLAIN plan; ANALYZE
+# runs the query again to time it, so only enable it while investigating
+SLOW_QUERY_LOG = {
+    "THRESHOLD": float(os.environ.get("SLOW_QUERY_THRESHOLD", 0.5)),
+    "EXPLAIN": True,
+    "ANALYZE": bool(int(os.environ.get("SLOW_QUERY_ANALYZE", 0))),
+    "COOLDOWN": 60,
+    "QUEUE_SIZE": 100,
+}
+
+TASK_WORKER_CONCURRENCY = int(os.environ.get("TASK_WORKER_CONCURRENCY", 2))
+TASK_MAX_ATTEMPTS = 5
+TASK_RETRY_BACKOFF = 10
+TASK_POLL_INTERVAL = 1
+TASK_LOCK_TIMEOUT = 15 * 60
+# Workers requeue stale tasks and delete the tasks finished longer than
+# TASK_RETENTION seconds ago every TASK_SWEEP_INTERVAL seconds
+TASK_SWEEP_INTERVAL = 60
+TASK_RETENTION = int(os.environ.get("TASK_RETENTION", 7 * 24 * 60 * 60))
+
+# Pagination classes are set per viewset, PAGE_SIZE is their default size
+SILENCED_SYSTEM_CHECKS = ["rest_framework.W001"]
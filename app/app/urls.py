@@ -15,12 +15,21 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import MediaView, metrics_view
+
+
+admin.autodiscover()
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("api/user/", include("user.urls")),
     path("api/recipe/", include("recipe.urls")),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path(
+        f"{settings.MEDIA_URL.lstrip('/')}<path:path>",
+        MediaView.as_view(),
+        name="media"
+    ),
+    path("metrics", metrics_view, name="metrics"),
+]
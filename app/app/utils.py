@@ -10,6 +10,10 @@ TOKEN_URL = reverse("user:token")
 ME_URL = reverse("user:me")
 TAGS_URL = reverse("recipe:tag-list")
 RECIPES_URL = reverse("recipe:recipe-list")
+RECIPES_BULK_URL = reverse("recipe:recipe-bulk")
+RECIPES_EXPORT_URL = reverse("recipe:recipe-export")
+RECIPE_STATS_URL = reverse("recipe:stats")
+METRICS_URL = reverse("metrics")
 
 ADMIN_PAYLOAD = {
     "email": "admin@test.com",
@@ -57,6 +61,10 @@ def image_upload_url(recipe_id):
     return reverse("recipe:recipe-upload-image", args=[recipe_id])
 
 
+def media_url(path):
+    return reverse("media", args=[path])
+
+
 def recipe_detail_url(recipe_id):
     return reverse("recipe:recipe-detail", args=[recipe_id])
 
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core import metrics
+
+
+class TokenUserCache:
+    """Cache of token keys to (user, token) with a time to live
+
+    When a cache alias is given the entries are kept in that Django cache,
+    so invalidations are shared between worker processes. Without one every
+    process keeps a bounded LRU, and a deleted token or deactivated user is
+    still accepted by the other processes until their entry expires.
+    """
+    key_prefix = "auth-token"
+
+    def __init__(self, max_size=1024, ttl=300, cache_alias=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache_key(self, key):
+        return f"{self.key_prefix}:{key}"
+
+    def _count(self, value):
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.registry.inc(
+            "auth_token_cache_requests_total",
+            (("result", "miss" if value is None else "hit"),),
+        )
+
+        return value
+
+    def get(self, key):
+        """Return the cached (user, token) for a token key or None"""
+        if self.cache_alias:
+            return self._count(
+                caches[self.cache_alias].get(self._cache_key(key))
+            )
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        return self._count(entry and entry[0])
+
+    def set(self, key, value):
+        """Cache the (user, token) for a token key"""
+        if self.cache_alias:
+            caches[self.cache_alias].set(
+                self._cache_key(key), value, timeout=self.ttl
+            )
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """Remove a token key from the cache"""
+        if self.cache_alias:
+            caches[self.cache_alias].delete(self._cache_key(key))
+            return
+
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_user(self, user_id):
+        """Remove every token of a user from the cache"""
+        if self.cache_alias:
+            keys = Token.objects.filter(
+                user_id=user_id
+            ).values_list("key", flat=True)
+            caches[self.cache_alias].delete_many(
+                [self._cache_key(key) for key in keys]
+            )
+            return
+
+        with self._lock:
+            for key, ((user, token), expires) in list(self._entries.items()):
+                if user.pk == user_id:
+                    del self._entries[key]
+
+    def clear(self):
+        """Remove all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return the hit and miss counters"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+            }
+
+
+token_cache = TokenUserCache(
+    max_size=settings.TOKEN_AUTH_CACHE["MAX_SIZE"],
+    ttl=settings.TOKEN_AUTH_CACHE["TTL"],
+    cache_alias=settings.TOKEN_AUTH_CACHE["CACHE_ALIAS"],
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token to user lookup"""
+
+    def authenticate_credentials(self, key):
+        """Return the cached user and token, authenticating on a miss"""
+        credentials = token_cache.get(key)
+
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(key, credentials)
+
+        return credentials
@@ -0,0 +1,86 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import urlencode
+
+
+def _cache():
+    return caches[settings.USER_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f"user-version:{user_id}"
+
+
+def _modified_key(user_id):
+    return f"user-modified:{user_id}"
+
+
+def _initial_version():
+    """Return a version that is newer than any evicted one"""
+    return int(time.time() * 1000000)
+
+
+def get_user_version(user_id):
+    """Return the version of a user's recipe data"""
+    cache = _cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+
+    return version
+
+
+def _bump(user_id):
+    cache = _cache()
+    key = _version_key(user_id)
+
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), timeout=None)
+
+    cache.set(_modified_key(user_id), int(time.time()), timeout=None)
+
+
+def bump_user_version(user_id):
+    """Change the version of a user's recipe data after a write
+
+    Inside a transaction the version changes again once it commits, so a
+    response cached by a concurrent request from the rows committed before
+    is never served after the write becomes visible.
+    """
+    _bump(user_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(user_id))
+
+
+def get_user_last_modified(user_id):
+    """Return the timestamp of the last write to a user's recipe data"""
+    return _cache().get(_modified_key(user_id))
+
+
+def user_cache_key(user_id, prefix, params=None):
+    """Return a cache key that changes with the user's data version"""
+    params = params or {}
+    items = params.lists() if hasattr(params, "lists") else params.items()
+    query = urlencode(sorted(items), doseq=True)
+    digest = hashlib.md5(query.encode()).hexdigest()
+
+    return f"{prefix}:{user_id}:{get_user_version(user_id)}:{digest}"
+
+
+def get_user_cache(key):
+    """Return a cached value or None"""
+    return _cache().get(key)
+
+
+def set_user_cache(key, value):
+    """Cache a value until it is superseded by a new user version"""
+    _cache().set(key, value, timeout=settings.USER_CACHE_TIMEOUT)
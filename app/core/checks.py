@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_user_cache(app_configs, **kwargs):
+    """Warn when the user cache is not shared between processes"""
+    backend = settings.CACHES[settings.USER_CACHE_ALIAS]["BACKEND"]
+    if backend not in LOCAL_CACHE_BACKENDS:
+        return []
+
+    return [Warning(
+        "The user cache is local to each process.",
+        hint="Set CACHE_LOCATION to a memcached server shared by the web "
+             "and worker processes, or their data versions, ETags and "
+             "token invalidations diverge.",
+        obj=settings.USER_CACHE_ALIAS,
+        id="core.W001",
+    )]
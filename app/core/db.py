@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.db import connections
+
+
+def close_unusable_connections():
+    """Close persistent connections that stopped working before reuse
+
+    Runs while DB_HEALTH_CHECK is enabled, so a server restart or dropped
+    connection costs a reconnect instead of an error.
+    """
+    if not settings.DB_HEALTH_CHECK:
+        return
+
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        if not connection.is_usable():
+            connection.close()
@@ -0,0 +1,256 @@
+import json
+import math
+import random
+import subprocess
+import time
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core.models import Tag, Ingredient
+from recipe.bulk import bulk_create_recipes
+
+
+BENCH_DOMAIN = "bench.invalid"
+WORDS = ("chicken", "beef", "tofu", "curry", "soup", "salad", "pasta",
+         "rice", "bread", "cake", "spicy", "green", "roast", "quick")
+
+
+BenchUser = namedtuple("BenchUser", ("token", "tags", "recipes"))
+
+
+def percentile(values, fraction):
+    """Return the nearest rank percentile of sorted values"""
+    if not values:
+        return None
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+def git_commit():
+    """Return the checked out git commit, if any"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the API on a synthetic dataset"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", type=int, default=5,
+            help="Number of users to create",
+        )
+        parser.add_argument(
+            "--recipes", type=int, default=200,
+            help="Number of recipes per user",
+        )
+        parser.add_argument(
+            "--tags", type=int, default=20,
+            help="Number of tags per user",
+        )
+        parser.add_argument(
+            "--ingredients", type=int, default=50,
+            help="Number of ingredients per user",
+        )
+        parser.add_argument(
+            "--density", type=int, default=3,
+            help="Number of tags and of ingredients per recipe",
+        )
+        parser.add_argument(
+            "--requests", type=int, default=500,
+            help="Number of requests to replay",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0,
+            help="Seed of the dataset and of the request mix",
+        )
+        parser.add_argument(
+            "--output",
+            help="File to save the results to as JSON",
+        )
+        parser.add_argument(
+            "--keep", action="store_true",
+            help="Keep the dataset instead of deleting it afterwards",
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+
+        self.stdout.write("Generating dataset...")
+        self.delete_dataset()
+        users = self.create_dataset(options)
+
+        try:
+            with override_settings(ALLOWED_HOSTS=["*"]):
+                timings = self.replay(users, options["requests"])
+        finally:
+            if not options["keep"]:
+                self.delete_dataset()
+
+        results = {
+            "commit": git_commit(),
+            "vendor": connection.vendor,
+            "options": {
+                key: options[key] for key in (
+                    "users", "recipes", "tags", "ingredients", "density",
+                    "requests", "seed",
+                )
+            },
+            "total": self.summarize(
+                [timing for endpoint in timings.values()
+                 for timing in endpoint]
+            ),
+            "endpoints": {
+                name: self.summarize(endpoint)
+                for name, endpoint in sorted(timings.items())
+            },
+        }
+
+        for name, summary in results["endpoints"].items():
+            self.stdout.write(
+                f"{name:<24} p50 {summary['p50_ms']:>8.2f}ms "
+                f"p95 {summary['p95_ms']:>8.2f}ms "
+                f"p99 {summary['p99_ms']:>8.2f}ms "
+                f"{summary['queries']:>6.1f} queries"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{results['total']['requests']} requests, "
+            f"{results['total']['throughput']:.1f} requests/s"
+        ))
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+
+    def delete_dataset(self):
+        """Delete the benchmark users and everything they own"""
+        get_user_model().objects.filter(
+            email__endswith=f"@{BENCH_DOMAIN}"
+        ).delete()
+
+    def create_dataset(self, options):
+        """Create the users and their tags, ingredients and recipes"""
+        users = []
+        for index in range(options["users"]):
+            user = get_user_model().objects.create_user(
+                email=f"bench-{index}@{BENCH_DOMAIN}"
+            )
+            Tag.objects.bulk_create([
+                Tag(user=user, name=f"tag {number}")
+                for number in range(options["tags"])
+            ])
+            Ingredient.objects.bulk_create([
+                Ingredient(user=user, name=f"ingredient {number}")
+                for number in range(options["ingredients"])
+            ])
+            tags = list(Tag.objects.filter(user=user))
+            ingredients = list(Ingredient.objects.filter(user=user))
+
+            bulk_create_recipes(user, [
+                {
+                    "title": " ".join(self.random.sample(WORDS, 3)),
+                    "time_minutes": self.random.randint(5, 120),
+                    "price": Decimal(self.random.randint(100, 5000)) / 100,
+                    "tags": self.random.sample(
+                        tags, min(options["density"], len(tags))
+                    ),
+                    "ingredients": self.random.sample(
+                        ingredients, min(options["density"], len(ingredients))
+                    ),
+                }
+                for _ in range(options["recipes"])
+            ])
+
+            users.append(BenchUser(
+                token=Token.objects.create(user=user).key,
+                tags=[tag.id for tag in tags],
+                recipes=list(user.recipe_set.values_list("id", flat=True)),
+            ))
+
+        return users
+
+    def endpoints(self, user):
+        """Return the weighted mix of requests to replay for a user"""
+        recipes_url = reverse("recipe:recipe-list")
+        tags = ",".join(
+            str(tag) for tag in self.random.sample(
+                user.tags, min(2, len(user.tags))
+            )
+        )
+        recipe_id = self.random.choice(user.recipes or [0])
+
+        return [
+            (30, "recipe-list", "get", recipes_url, {}),
+            (10, "recipe-list-tags", "get", recipes_url, {"tags": tags}),
+            (10, "recipe-search", "get", recipes_url,
+             {"search": self.random.choice(WORDS)[:3]}),
+            (20, "recipe-detail", "get",
+             reverse("recipe:recipe-detail", args=[recipe_id]), {}),
+            (10, "tag-list", "get", reverse("recipe:tag-list"), {}),
+            (5, "tag-list-assigned", "get", reverse("recipe:tag-list"),
+             {"assigned_only": 1}),
+            (10, "ingredient-list", "get",
+             reverse("recipe:ingredient-list"), {}),
+            (5, "recipe-create", "post", recipes_url, {
+                "title": "bench recipe",
+                "time_minutes": 10,
+                "price": "5.00",
+                "tags": user.tags[:2],
+            }),
+        ]
+
+    def replay(self, users, count):
+        """Send the request mix and return durations and query counts"""
+        client = Client()
+        timings = defaultdict(list)
+
+        for _ in range(count):
+            user = self.random.choice(users)
+            endpoints = self.endpoints(user)
+            _, name, method, path, data = self.random.choices(
+                endpoints, weights=[endpoint[0] for endpoint in endpoints]
+            )[0]
+            headers = {"HTTP_AUTHORIZATION": f"Token {user.token}"}
+            if method == "post":
+                headers["content_type"] = "application/json"
+                data = json.dumps(data)
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = getattr(client, method)(path, data, **headers)
+                duration = time.perf_counter() - started
+
+            if response.status_code >= 400:
+                self.stderr.write(
+                    f"{name} returned {response.status_code}"
+                )
+            timings[name].append((duration, len(queries)))
+
+        return timings
+
+    def summarize(self, timings):
+        """Return latency percentiles, queries and throughput of timings"""
+        durations = sorted(duration for duration, _ in timings)
+        total = sum(durations)
+
+        return {
+            "requests": len(durations),
+            "p50_ms": percentile(durations, 0.50) * 1000,
+            "p95_ms": percentile(durations, 0.95) * 1000,
+            "p99_ms": percentile(durations, 0.99) * 1000,
+            "mean_ms": total / len(durations) * 1000,
+            "queries": sum(queries for _, queries in timings) / len(timings),
+            "throughput": len(durations) / total if total else None,
+        }
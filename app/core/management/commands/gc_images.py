@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Recipe, StoredImage
+from core.storage import variant_name
+
+
+class Command(BaseCommand):
+    """Django command to delete image files no recipe references"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-minutes", type=int, default=60,
+            help="Only delete images unreferenced for this many minutes",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=500,
+            help="Number of images to delete per batch",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report the images without deleting them",
+        )
+
+    def handle(self, *args, **options):
+        storage = Recipe._meta.get_field("image").storage
+        cutoff = timezone.now() - timedelta(minutes=options["grace_minutes"])
+        orphans = StoredImage.objects.filter(
+            references__lte=0,
+            updated__lt=cutoff,
+        ).order_by("id")
+
+        deleted = 0
+        last_id = 0
+        while True:
+            batch = list(orphans.filter(id__gt=last_id)[
+                :options["batch_size"]
+            ])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            for image in batch:
+                names = [image.name] + [
+                    variant_name(image.name, size)
+                    for size in settings.RECIPE_IMAGE_VARIANT_SIZES
+                ]
+                if options["dry_run"]:
+                    self.stdout.write(image.name)
+                    continue
+
+                # Skip images that were referenced again in the meantime
+                if not StoredImage.objects.filter(
+                    id=image.id, references__lte=0
+                ).delete()[0]:
+                    continue
+                for name in names:
+                    storage.delete(name)
+                deleted += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} images"))
@@ -0,0 +1,82 @@
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipe.imports import RecipeImporter, parse_row, read_rows
+
+
+class Command(BaseCommand):
+    """Django command to import recipes from a JSON lines or CSV file"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import")
+        parser.add_argument(
+            "--user", required=True,
+            help="Email of the user who will own the recipes",
+        )
+        parser.add_argument(
+            "--format", choices=("jsonl", "csv"),
+            help="Format of the file, guessed from its extension by default",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=1000,
+            help="Number of rows to create per transaction",
+        )
+        parser.add_argument(
+            "--separator", default="|",
+            help="Separator of tag and ingredient names in CSV files",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options["user"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist")
+
+        path = options["path"]
+        file_format = options["format"] or (
+            "csv" if path.lower().endswith(".csv") else "jsonl"
+        )
+        importer = RecipeImporter(user)
+        imported = skipped = 0
+        started = time.monotonic()
+
+        with open(path, newline="", encoding="utf-8") as file:
+            rows = read_rows(file, file_format, options["separator"])
+            while True:
+                chunk = list(islice(rows, options["chunk_size"]))
+                if not chunk:
+                    break
+
+                parsed_rows = []
+                for line_number, row in chunk:
+                    try:
+                        parsed_rows.append(parse_row(row))
+                    except ValidationError as error:
+                        skipped += 1
+                        self.stderr.write(
+                            f"Line {line_number}: {' '.join(error.messages)}"
+                        )
+
+                if parsed_rows:
+                    with transaction.atomic():
+                        importer.import_chunk(parsed_rows)
+                imported += len(parsed_rows)
+
+                if options["verbosity"] > 1:
+                    self.stdout.write(
+                        f"Imported {imported} recipes "
+                        f"({self.rate(imported, started)} rows/s)"
+                    )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} recipes, skipped {skipped} rows "
+            f"({self.rate(imported + skipped, started)} rows/s)"
+        ))
+
+    def rate(self, rows, started):
+        return round(rows / max(time.monotonic() - started, 1e-6))
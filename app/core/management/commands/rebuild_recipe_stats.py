@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core import stats
+
+
+class Command(BaseCommand):
+    """Django command to recompute or check the recipe statistics"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user", action="append", dest="emails",
+            help="Email of a user to process, all users by default",
+        )
+        parser.add_argument(
+            "--check", action="store_true",
+            help="Report differences without fixing them",
+        )
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by("id")
+        if options["emails"]:
+            users = users.filter(email__in=options["emails"])
+
+        inconsistent = 0
+        for user_id, email in users.values_list("id", "email").iterator():
+            if not options["check"]:
+                stats.rebuild(user_id)
+                continue
+
+            differences = stats.differences(user_id)
+            if differences:
+                inconsistent += 1
+                for name, (stored, computed) in differences.items():
+                    self.stdout.write(
+                        f"{email}: {name} is {stored}, expected {computed}"
+                    )
+
+        if inconsistent:
+            raise CommandError(f"{inconsistent} users have wrong statistics")
+
+        self.stdout.write(self.style.SUCCESS(
+            "Statistics are consistent" if options["check"]
+            else "Statistics rebuilt"
+        ))
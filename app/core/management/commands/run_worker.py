@@ -0,0 +1,106 @@
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils.module_loading import autodiscover_modules
+
+from core import tasks
+from core.db import close_unusable_connections
+
+
+class Command(BaseCommand):
+    """Django command to run queued tasks"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int,
+            default=settings.TASK_WORKER_CONCURRENCY,
+            help="Number of tasks to run at the same time",
+        )
+        parser.add_argument(
+            "--burst", action="store_true",
+            help="Exit once no task is due instead of polling",
+        )
+
+    def handle(self, *args, **options):
+        autodiscover_modules("tasks")
+        self.burst = options["burst"]
+        self.stopping = threading.Event()
+        self.swept_at = None
+        self.sweep_lock = threading.Lock()
+        name = f"{socket.gethostname()}:{os.getpid()}"
+
+        workers = [f"{name}:{index}" for index in range(
+            options["concurrency"]
+        )]
+        self.stdout.write(f"Worker {name} running {len(workers)} threads...")
+
+        if len(workers) == 1:
+            try:
+                self.work(workers[0])
+            except KeyboardInterrupt:
+                pass
+        else:
+            self.run_threads(workers)
+
+        self.stdout.write(self.style.SUCCESS("Worker stopped"))
+
+    def run_threads(self, workers):
+        """Run every worker in its own thread until they finish"""
+        threads = [
+            threading.Thread(target=self.work, args=(worker,))
+            for worker in workers
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            self.stopping.set()
+            for thread in threads:
+                thread.join()
+
+    def sweep(self):
+        """Requeue stale tasks and delete old finished ones
+
+        Runs when the worker starts and then every TASK_SWEEP_INTERVAL, so
+        the tasks of a crashed worker are picked up by the running ones.
+        """
+        with self.sweep_lock:
+            now = time.monotonic()
+            if self.swept_at is not None and \
+                    now - self.swept_at < settings.TASK_SWEEP_INTERVAL:
+                return
+            self.swept_at = now
+
+        requeued = tasks.requeue_stale()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale tasks")
+        deleted = tasks.delete_finished()
+        if deleted:
+            self.stdout.write(f"Deleted {deleted} finished tasks")
+
+    def work(self, worker):
+        """Claim and run tasks until stopped"""
+        while not self.stopping.is_set():
+            close_old_connections()
+            close_unusable_connections()
+            self.sweep()
+            claimed = tasks.claim(worker)
+
+            if claimed is None:
+                if self.burst:
+                    break
+                time.sleep(settings.TASK_POLL_INTERVAL)
+                continue
+
+            claimed = tasks.run(claimed)
+            self.stdout.write(f"{claimed} #{claimed.id}")
+
+        close_old_connections()
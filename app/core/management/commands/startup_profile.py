@@ -0,0 +1,51 @@
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import startup
+
+
+class Command(BaseCommand):
+    """Django command to profile the start up of a fresh process"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path", default="/api/recipe/recipes/",
+            help="Path of the first request",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=25,
+            help="Number of modules to report",
+        )
+        parser.add_argument(
+            "--sort", choices=("self", "total"), default="total",
+            help="Sort modules by their own or their cumulative import time",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            profile = startup.run(options["path"])
+        except subprocess.CalledProcessError as error:
+            raise CommandError(error.stderr.decode())
+
+        self.stdout.write(f"{'self':>10} {'total':>10}  module")
+        modules = sorted(
+            profile["modules"].items(),
+            key=lambda item: item[1][options["sort"]],
+            reverse=True,
+        )
+        for name, timing in modules[:options["limit"]]:
+            self.stdout.write(
+                f"{timing['self'] * 1000:>8.1f}ms "
+                f"{timing['total'] * 1000:>8.1f}ms  {name}"
+            )
+
+        self.stdout.write(
+            f"{len(profile['modules'])} modules imported\n"
+            f"Django setup:   {profile['setup'] * 1000:>8.1f}ms\n"
+            f"WSGI app ready: {profile['application'] * 1000:>8.1f}ms"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"First request:  {profile['first_request'] * 1000:>8.1f}ms "
+            f"({profile['status']})"
+        ))
@@ -1,21 +1,61 @@
 import time
 
-from django.db import connections
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+
+INITIAL_DELAY = 0.1
+MAX_DELAY = 5
 
 
 class Command(BaseCommand):
     """Django command to pause execution until database is available"""
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database", default=DEFAULT_DB_ALIAS,
+            help="Database to wait for",
+        )
+        parser.add_argument(
+            "--timeout", type=float, default=60,
+            help="Number of seconds to wait before giving up",
+        )
+        parser.add_argument(
+            "--migrations", action="store_true",
+            help="Also wait until every migration has been applied",
+        )
+
     def handle(self, *args, **options):
         self.stdout.write("Waiting for database...")
-        db_conn = None
-        while not db_conn:
+        connection = connections[options["database"]]
+        deadline = time.monotonic() + options["timeout"]
+        delay = INITIAL_DELAY
+
+        while True:
             try:
-                db_conn = connections["default"]
+                connection.ensure_connection()
+                if not options["migrations"] or \
+                        not self.unapplied_migrations(connection):
+                    break
+                reason = "Migrations not applied"
             except OperationalError:
-                self.stdout.write("Database unavilable, waiting 1 second...")
-                time.sleep(1)
+                reason = "Database unavailable"
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise CommandError(
+                    f"{reason} after {options['timeout']:g} seconds"
+                )
+            wait = min(delay, remaining)
+            self.stdout.write(f"{reason}, waiting {wait:.1f} seconds...")
+            time.sleep(wait)
+            delay = min(delay * 2, MAX_DELAY)
 
         self.stdout.write(self.style.SUCCESS("Database available!"))
+
+    def unapplied_migrations(self, connection):
+        """Return the migrations that have not been applied yet"""
+        executor = MigrationExecutor(connection)
+        return executor.migration_plan(executor.loader.graph.leaf_nodes())
@@ -0,0 +1,303 @@
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+COUNTERS = {
+    "http_requests_total": "Number of HTTP requests.",
+    "http_request_db_query_seconds_total":
+        "Time spent in database queries while handling requests.",
+    "auth_token_cache_requests_total":
+        "Token authentication cache lookups by result.",
+}
+HISTOGRAMS = {
+    "http_request_duration_seconds": (
+        "Time taken to handle HTTP requests.",
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    "http_request_db_queries": (
+        "Number of database queries per HTTP request.",
+        (0, 1, 2, 5, 10, 20, 50, 100),
+    ),
+    "http_response_size_bytes": (
+        "Size of HTTP response bodies.",
+        (100, 1000, 10000, 100000, 1000000, 10000000),
+    ),
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n") \
+        .replace('"', r'\"')
+
+
+def _format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(
+        f'{name}="{_escape(value)}"' for name, value in pairs
+    ) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _merge(counters, histograms, snapshot, sign=1):
+    """Add the values of a saved snapshot to counters and histograms"""
+    for name, labels, value in snapshot["counters"]:
+        counters[name, tuple(map(tuple, labels))] += sign * value
+    for name, labels, values in snapshot["histograms"]:
+        key = name, tuple(map(tuple, labels))
+        if key in histograms:
+            histograms[key] = [
+                total + sign * value
+                for total, value in zip(histograms[key], values)
+            ]
+        else:
+            histograms[key] = [sign * value for value in values]
+
+
+def _to_snapshot(counters, histograms):
+    return {
+        "counters": [
+            [name, labels, value]
+            for (name, labels), value in counters.items()
+        ],
+        "histograms": [
+            [name, labels, list(values)]
+            for (name, labels), values in histograms.items()
+        ],
+    }
+
+
+class MetricsRegistry:
+    """Counters and histograms aggregated in process
+
+    When a directory is given every process regularly saves its values
+    there, and collecting sums the values of all processes. Files not saved
+    for ``stale_after`` seconds belong to processes that exited or went
+    idle, so they are folded into a base file that keeps their totals; an
+    idle process finding its file folded subtracts what it had saved.
+    """
+
+    BASE_FILE = "base.json"
+    LOCK_FILE = ".lock"
+
+    def __init__(self, directory=None, flush_interval=5, stale_after=300,
+                 process_id=None):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.stale_after = stale_after
+        # A unique suffix keeps a reused pid from overwriting old totals
+        self.process_id = process_id or \
+            f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._flushed = 0
+        self._saved = None
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels, value=1):
+        """Add a value to a counter"""
+        with self._lock:
+            self._counters[name, labels] += value
+
+    def observe(self, name, labels, value):
+        """Record a value in a histogram"""
+        buckets = HISTOGRAMS[name][1]
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[name, labels] = \
+                    [0] * len(buckets) + [0, 0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[index] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def snapshot(self):
+        """Return the values of this process"""
+        with self._lock:
+            return _to_snapshot(self._counters, self._histograms)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _directory_lock(self):
+        """Serialize saving and folding between processes"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(self.LOCK_FILE), "a") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def _write(self, name, snapshot):
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(descriptor, "w") as file:
+            json.dump(snapshot, file)
+        os.replace(temporary, self._path(name))
+
+    def _read(self, name):
+        try:
+            with open(self._path(name)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _release_folded(self):
+        """Drop the saved values another process folded into the base"""
+        if self._saved is not None and \
+                not os.path.exists(self._path(f"{self.process_id}.json")):
+            with self._lock:
+                _merge(self._counters, self._histograms, self._saved, -1)
+            self._saved = None
+
+    def flush(self, force=False):
+        """Save the values of this process for the other processes"""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed < self.flush_interval:
+            return
+        self._flushed = now
+
+        with self._directory_lock():
+            self._release_folded()
+            snapshot = self.snapshot()
+            self._write(f"{self.process_id}.json", snapshot)
+            self._saved = snapshot
+
+    def _fold_stale(self, names):
+        """Move the values of stale files into the base file"""
+        stale_before = time.time() - self.stale_after
+        counters, histograms, stale = defaultdict(float), {}, []
+        for name in names:
+            try:
+                if os.path.getmtime(self._path(name)) >= stale_before:
+                    continue
+            except OSError:
+                continue
+            snapshot = self._read(name)
+            if snapshot is not None:
+                _merge(counters, histograms, snapshot)
+            stale.append(name)
+
+        if not stale:
+            return names
+
+        base = self._read(self.BASE_FILE)
+        if base is not None:
+            _merge(counters, histograms, base)
+        self._write(self.BASE_FILE, _to_snapshot(counters, histograms))
+        for name in stale:
+            os.remove(self._path(name))
+
+        return [name for name in names if name not in stale]
+
+    def _snapshots(self):
+        if not self.directory or not os.path.isdir(self.directory):
+            return [self.snapshot()]
+
+        with self._directory_lock():
+            self._release_folded()
+            own = f"{self.process_id}.json"
+            names = self._fold_stale([
+                name for name in os.listdir(self.directory)
+                if name.endswith(".json")
+                and name not in (own, self.BASE_FILE)
+            ])
+            snapshots = [self.snapshot()]
+            for name in [self.BASE_FILE] + names:
+                snapshot = self._read(name)
+                if snapshot is not None:
+                    snapshots.append(snapshot)
+
+        return snapshots
+
+    def collect(self):
+        """Return the counters and histograms summed over processes"""
+        counters = defaultdict(float)
+        histograms = {}
+        for snapshot in self._snapshots():
+            _merge(counters, histograms, snapshot)
+
+        return counters, histograms
+
+    def render(self):
+        """Return the metrics in the Prometheus text format"""
+        counters, histograms = self.collect()
+        lines = []
+
+        for name, help_text in COUNTERS.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(
+                        f"{name}{_format_labels(labels)} "
+                        f"{_format_value(value)}"
+                    )
+
+        for name, (help_text, buckets) in HISTOGRAMS.items():
+            lines += [
+                f"# HELP {name} {help_text}", f"# TYPE {name} histogram"
+            ]
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(buckets, values):
+                    lines.append(
+                        f"{name}_bucket{_format_labels(labels, le=bound)} "
+                        f"{count}"
+                    )
+                lines += [
+                    f"{name}_bucket{_format_labels(labels, le='+Inf')} "
+                    f"{values[-1]}",
+                    f"{name}_sum{_format_labels(labels)} "
+                    f"{_format_value(values[-2])}",
+                    f"{name}_count{_format_labels(labels)} {values[-1]}",
+                ]
+
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        """Remove the values of this process"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._saved = None
+
+
+registry = MetricsRegistry(
+    directory=settings.METRICS["DIRECTORY"],
+    flush_interval=settings.METRICS["FLUSH_INTERVAL"],
+    stale_after=settings.METRICS["STALE_AFTER"],
+)
+
+
+def record_request(route, method, status, duration, queries, query_time,
+                   size=None):
+    """Record the metrics of a handled request"""
+    labels = (("method", method), ("route", route))
+
+    registry.inc("http_requests_total", labels + (("status", str(status)),))
+    registry.inc("http_request_db_query_seconds_total", labels, query_time)
+    registry.observe("http_request_duration_seconds", labels, duration)
+    registry.observe("http_request_db_queries", labels, queries)
+    if size is not None:
+        registry.observe("http_response_size_bytes", labels, size)
+
+    registry.flush()
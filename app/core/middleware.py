@@ -0,0 +1,160 @@
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+from core import metrics, routers, slow_queries
+
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class QueryCounter:
+    """Database execute wrapper counting and timing queries"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+def streams_queries(response):
+    """Return whether a response may query the database while it is sent
+
+    Streamed content is produced after the middleware returned. File
+    responses only read their file, and are left alone so servers can
+    still send them with wsgi.file_wrapper.
+    """
+    return response.streaming and \
+        getattr(response, "file_to_stream", None) is None
+
+
+def stream_within(response, scope):
+    """Keep a scope open while a streaming response is sent"""
+    content = response.streaming_content
+
+    def stream():
+        with scope():
+            yield from content
+
+    response.streaming_content = stream()
+
+
+@contextmanager
+def wrap_connections(make_wrapper):
+    """Install an execute wrapper on every database connection"""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(
+                connection.execute_wrapper(make_wrapper(connection))
+            )
+        yield
+
+
+class MetricsMiddleware:
+    """Record the latency, queries and response size of requests by route
+
+    Streaming responses are recorded once their content has been sent, so
+    the queries run while streaming are counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with wrap_connections(lambda connection: queries):
+            response = self.get_response(request)
+
+        if streams_queries(response):
+            content = response.streaming_content
+
+            def stream():
+                size = 0
+                try:
+                    with wrap_connections(lambda connection: queries):
+                        for chunk in content:
+                            size += len(chunk)
+                            yield chunk
+                finally:
+                    self.record(request, response, started, queries, size)
+
+            response.streaming_content = stream()
+        else:
+            self.record(
+                request, response, started, queries,
+                None if response.streaming else len(response.content),
+            )
+
+        return response
+
+    def record(self, request, response, started, queries, size):
+        resolver_match = getattr(request, "resolver_match", None)
+        metrics.record_request(
+            route=resolver_match.view_name if resolver_match else "unmatched",
+            method=request.method,
+            status=response.status_code,
+            duration=time.perf_counter() - started,
+            queries=queries.count,
+            query_time=queries.duration,
+            size=size,
+        )
+
+
+class SlowQueryMiddleware:
+    """Log the slow queries of requests with the view that ran them"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        log = slow_queries.slow_query_log
+        if log.threshold is None:
+            return self.get_response(request)
+
+        def scope():
+            return wrap_connections(
+                lambda connection: slow_queries.SlowQueryWrapper(
+                    log, connection.alias, request
+                )
+            )
+
+        with scope():
+            response = self.get_response(request)
+        if streams_queries(response):
+            stream_within(response, scope)
+
+        return response
+
+
+class ReplicaMiddleware:
+    """Allow the reads of safe requests to go to a read replica
+
+    The replica is chosen by the router once ``request.user`` is
+    authenticated, whichever authentication class resolved it, and
+    streamed content reads from the replica as well.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        def scope():
+            return routers.request_scope(
+                request, request.method in SAFE_METHODS
+            )
+
+        with scope():
+            response = self.get_response(request)
+        if streams_queries(response):
+            stream_within(response, scope)
+
+        return response
@@ -0,0 +1,60 @@
+# Generated by Django 2.1.15 on 2026-10-18 01:50
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BATCH_SIZE = 500
+
+
+def tokenize(text):
+    # A frozen copy of core.search.tokenize, so replaying this migration
+    # builds the same tokens whatever the tokenizer later becomes
+    words = re.findall(r"\w+", text.lower())
+
+    return list(dict.fromkeys(word[:64] for word in words))
+
+
+def index_existing_recipes(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    RecipeSearchToken = apps.get_model('core', 'RecipeSearchToken')
+    recipes = Recipe.objects.only('id', 'user_id', 'title').iterator(
+        chunk_size=BATCH_SIZE
+    )
+    batch = []
+    for recipe in recipes:
+        batch += [
+            RecipeSearchToken(
+                user_id=recipe.user_id,
+                recipe_id=recipe.id,
+                token=token,
+            )
+            for token in tokenize(recipe.title)
+        ]
+        if len(batch) >= BATCH_SIZE:
+            RecipeSearchToken.objects.bulk_create(batch)
+            batch = []
+    RecipeSearchToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_user_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(db_index=True, max_length=64)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='core.Recipe')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(index_existing_recipes, migrations.RunPython.noop),
+    ]
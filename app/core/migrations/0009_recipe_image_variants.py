@@ -0,0 +1,18 @@
+# Generated by Django 2.1.15 on 2026-10-18 01:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipesearchtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 2.1.15 on 2026-10-18 01:58
+
+import core.models
+import core.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_existing_images(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    StoredImage = apps.get_model('core', 'StoredImage')
+    images = Recipe.objects.exclude(image='').exclude(image=None).values(
+        'image'
+    ).annotate(references=Count('id'))
+    StoredImage.objects.bulk_create(
+        [
+            StoredImage(name=image['image'], references=image['references'])
+            for image in images
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('references', models.IntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_image_file_path),
+        ),
+        migrations.RunPython(count_existing_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 2.1.15 on 2026-10-18 02:24
+
+from bisect import bisect_right
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+
+def build_recipe_stats(apps, schema_editor):
+    User = apps.get_model('core', 'User')
+    Recipe = apps.get_model('core', 'Recipe')
+    RecipeStats = apps.get_model('core', 'RecipeStats')
+    RecipeStatsCount = apps.get_model('core', 'RecipeStatsCount')
+
+    for user_id in User.objects.values_list('id', flat=True).iterator():
+        recipes = Recipe.objects.filter(user_id=user_id)
+        totals = recipes.aggregate(
+            recipes=Count('id'),
+            time_minutes=Sum('time_minutes'),
+            price=Sum('price'),
+        )
+        RecipeStats.objects.create(
+            user_id=user_id,
+            recipes=totals['recipes'],
+            time_minutes=totals['time_minutes'] or 0,
+            price=totals['price'] or 0,
+        )
+
+        counts = Counter(
+            ('price', bisect_right(settings.RECIPE_STATS_PRICE_RANGES, price))
+            for price in recipes.values_list('price', flat=True)
+        )
+        for field_name, dimension in (('tags', 'tag'),
+                                      ('ingredients', 'ingredient')):
+            through = getattr(Recipe, field_name).through
+            column = getattr(Recipe, field_name).field.m2m_reverse_name()
+            rows = through.objects.filter(recipe__user_id=user_id).values(
+                column
+            ).annotate(count=Count('id'))
+            for row in rows:
+                counts[dimension, row[column]] = row['count']
+
+        RecipeStatsCount.objects.bulk_create(
+            [
+                RecipeStatsCount(
+                    user_id=user_id, dimension=dimension, key=key, count=count
+                )
+                for (dimension, key), count in counts.items()
+            ],
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recipe_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipes', models.IntegerField(default=0)),
+                ('time_minutes', models.BigIntegerField(default=0)),
+                ('price', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecipeStatsCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('tag', 'Tag'), ('ingredient', 'Ingredient'), ('price', 'Price range')], max_length=16)),
+                ('key', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='recipestatscount',
+            unique_together={('user', 'dimension', 'key')},
+        ),
+        migrations.RunPython(build_recipe_stats, migrations.RunPython.noop),
+    ]
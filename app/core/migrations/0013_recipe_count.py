@@ -0,0 +1,60 @@
+# Generated by Django 2.1.15 on 2026-10-18 02:36
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_recipes(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    RecipeStatsCount = apps.get_model('core', 'RecipeStatsCount')
+
+    for field_name, model_name in (('tags', 'Tag'),
+                                   ('ingredients', 'Ingredient')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field_name).through
+        column = getattr(Recipe, field_name).field.m2m_reverse_name()
+        links = through.objects.filter(**{column: OuterRef('id')}).order_by()
+        model.objects.update(recipe_count=Coalesce(
+            Subquery(
+                links.values(column).annotate(count=Count('id'))
+                .values('count')
+            ),
+            0,
+        ))
+
+    RecipeStatsCount.objects.exclude(dimension='price').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipestats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_recipes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='recipestatscount',
+            name='dimension',
+            field=models.CharField(choices=[('price', 'Price range')], max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', '-recipe_count', 'id'], name='core_ingredient_user_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-recipe_count', 'id'], name='core_tag_user_count_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 2.1.15 on 2026-10-18 03:17
+
+from django.db import migrations, models
+
+
+def use_pattern_ops(apps, schema_editor):
+    """Rebuild the index so PostgreSQL can use it for LIKE 'prefix%'"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX core_search_user_token_idx')
+    schema_editor.execute(
+        'CREATE INDEX core_search_user_token_idx ON core_recipesearchtoken '
+        '(user_id, token varchar_pattern_ops)'
+    )
+
+
+def use_default_ops(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX core_search_user_token_idx')
+    schema_editor.execute(
+        'CREATE INDEX core_search_user_token_idx ON core_recipesearchtoken '
+        '(user_id, token)'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_recipe_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipesearchtoken',
+            name='token',
+            field=models.CharField(max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='recipesearchtoken',
+            index=models.Index(fields=['user', 'token'], name='core_search_user_token_idx'),
+        ),
+        migrations.RunPython(use_pattern_ops, use_default_ops),
+    ]
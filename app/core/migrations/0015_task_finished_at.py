@@ -0,0 +1,32 @@
+# Generated by Django 2.1.15 on 2026-10-18 03:25
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def set_finished_at(apps, schema_editor):
+    Task = apps.get_model('core', 'Task')
+    # The last scheduled run is the closest known time they finished
+    Task.objects.filter(status__in=('done', 'failed')).update(
+        finished_at=F('run_at')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_search_user_token_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(set_finished_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'finished_at'], name='core_task_status_finished_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_task_finished_at'),
+    ]
+
+    # Filtering recipes by tags or ingredients looks links up by tag_id or
+    # ingredient_id, which the foreign key indexes already cover, and the
+    # unique (recipe_id, ...) indexes serve the per-recipe lookups
+    operations = [
+        migrations.RunSQL(
+            'DROP INDEX IF EXISTS core_recipe_tags_reverse_idx',
+            'CREATE INDEX core_recipe_tags_reverse_idx '
+            'ON core_recipe_tags (tag_id, recipe_id)',
+        ),
+        migrations.RunSQL(
+            'DROP INDEX IF EXISTS core_recipe_ingr_reverse_idx',
+            'CREATE INDEX core_recipe_ingr_reverse_idx '
+            'ON core_recipe_ingredients (ingredient_id, recipe_id)',
+        ),
+    ]
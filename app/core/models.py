@@ -2,10 +2,13 @@ import uuid
 import os
 
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 from django.conf import settings
 
+from core.storage import recipe_image_storage
+
 
 def recipe_image_file_path(instance, filename):
     """Generate file path for new recipe image"""
@@ -56,6 +59,19 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    recipe_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "-name", "id"],
+                name="core_tag_user_name_idx"
+            ),
+            models.Index(
+                fields=["user", "-recipe_count", "id"],
+                name="core_tag_user_count_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -68,6 +84,19 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    recipe_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "-name", "id"],
+                name="core_ingredient_user_name_idx"
+            ),
+            models.Index(
+                fields=["user", "-recipe_count", "id"],
+                name="core_ingredient_user_count_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -85,7 +114,140 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField("Ingredient")
     tags = models.ManyToManyField("tag")
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=recipe_image_storage,
+    )
+    image_variants = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "-id"],
+                name="core_recipe_user_id_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class RecipeSearchToken(models.Model):
+    """Word of a recipe title in the recipe search index"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey(
+        "Recipe",
+        on_delete=models.CASCADE,
+        related_name="search_tokens",
+    )
+    token = models.CharField(max_length=64)
+
+    class Meta:
+        # Created with varchar_pattern_ops on PostgreSQL by its migration,
+        # so prefix searches stay within the user's tokens
+        indexes = [
+            models.Index(
+                fields=["user", "token"],
+                name="core_search_user_token_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return self.token
+
+
+class StoredImage(models.Model):
+    """Content addressed image file with the number of recipes using it"""
+    name = models.CharField(max_length=255, unique=True)
+    references = models.IntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Task(models.Model):
+    """Deferred function call run by the run_worker command"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    name = models.CharField(max_length=255)
+    payload = models.TextField(default="{}")
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+    )
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=255, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "run_at"],
+                name="core_task_status_run_at_idx"
+            ),
+            models.Index(
+                fields=["status", "finished_at"],
+                name="core_task_status_finished_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class RecipeStats(models.Model):
+    """Totals of a user's recipes, kept up to date as recipes change"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="recipe_stats",
+    )
+    recipes = models.IntegerField(default=0)
+    time_minutes = models.BigIntegerField(default=0)
+    price = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.recipes} recipes"
+
+
+class RecipeStatsCount(models.Model):
+    """Number of a user's recipes per price range"""
+    PRICE = "price"
+    DIMENSION_CHOICES = (
+        (PRICE, "Price range"),
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    dimension = models.CharField(max_length=16, choices=DIMENSION_CHOICES)
+    key = models.IntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = (("user", "dimension", "key"),)
+
+    def __str__(self):
+        return f"{self.dimension} {self.key}: {self.count}"
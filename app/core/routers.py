@@ -0,0 +1,83 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from core.cache import get_user_last_modified
+
+
+_state = threading.local()
+
+
+@contextmanager
+def request_scope(request, read_only):
+    """Route the reads of a request, allowing replicas if it is read only"""
+    _state.request = request if read_only else None
+    _state.replica = None
+    _state.resolving = False
+    try:
+        yield
+    finally:
+        _state.request = None
+        _state.replica = None
+        _state.resolving = False
+
+
+def _pick_replica(user_id):
+    """Return a replica for a user, or the primary if they wrote recently
+
+    Users who wrote within REPLICA_PIN_SECONDS keep reading from the
+    primary so they see their own changes.
+    """
+    last_modified = get_user_last_modified(user_id)
+    if last_modified is not None and \
+            time.time() - last_modified < settings.REPLICA_PIN_SECONDS:
+        return DEFAULT_DB_ALIAS
+
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def _replica():
+    """Return the database the current request reads from, if decided
+
+    The decision waits until the request's user is authenticated, by any
+    authentication class, and is kept for the rest of the request. Reads
+    made while resolving the user, such as a session lookup, go to the
+    primary.
+    """
+    request = getattr(_state, "request", None)
+    if request is None or _state.resolving or \
+            not settings.DATABASE_REPLICAS:
+        return None
+
+    if _state.replica is None:
+        _state.resolving = True
+        try:
+            user = getattr(request, "user", None)
+            authenticated = user is not None and user.is_authenticated
+        finally:
+            _state.resolving = False
+        if not authenticated:
+            return None
+        _state.replica = _pick_replica(user.pk)
+
+    return _state.replica
+
+
+class ReplicaRouter:
+    """Send the reads of authenticated read only requests to a replica"""
+
+    def db_for_read(self, model, **hints):
+        return _replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
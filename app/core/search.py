@@ -0,0 +1,73 @@
+import re
+
+from django.db.models import Case, IntegerField, Max, OuterRef, Q, \
+                             Subquery, Value, When
+
+from core.models import RecipeSearchToken
+
+
+TOKEN_MAX_LENGTH = 64
+
+
+def tokenize(text):
+    """Return the unique lowercase words of a text"""
+    words = re.findall(r"\w+", text.lower())
+
+    return list(dict.fromkeys(word[:TOKEN_MAX_LENGTH] for word in words))
+
+
+def index_recipes(recipes, created=False):
+    """Replace the search tokens of recipes with tokens of their titles"""
+    if not created:
+        RecipeSearchToken.objects.filter(recipe__in=recipes).delete()
+    RecipeSearchToken.objects.bulk_create(
+        [
+            RecipeSearchToken(
+                user_id=recipe.user_id,
+                recipe_id=recipe.id,
+                token=token,
+            )
+            for recipe in recipes
+            for token in tokenize(recipe.title)
+        ],
+        batch_size=500,
+    )
+
+
+def search_recipes(queryset, user, text):
+    """Filter recipes whose title words start with the search terms
+
+    Recipes are annotated with ``search_rank``: every term scores 2 when a
+    title word equals it and 1 when a title word only starts with it.
+    """
+    terms = tokenize(text)
+    if not terms:
+        return queryset.none()
+
+    matches = Q()
+    for term in terms:
+        matches |= Q(token__startswith=term)
+
+    scores = [
+        Max(Case(
+            When(token=term, then=Value(2)),
+            When(token__startswith=term, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+        for term in terms
+    ]
+    rank = scores[0]
+    for score in scores[1:]:
+        rank = rank + score
+
+    candidates = RecipeSearchToken.objects.filter(matches, user=user)
+    ranks = candidates.filter(
+        recipe_id=OuterRef("pk")
+    ).values("recipe_id").annotate(rank=rank).values("rank")
+
+    return queryset.filter(
+        id__in=candidates.values("recipe_id")
+    ).annotate(
+        search_rank=Subquery(ranks, output_field=IntegerField())
+    )
@@ -0,0 +1,218 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import transaction, IntegrityError
+from django.db.models import F
+from django.db.models.signals import post_init, post_save, pre_delete, \
+                                     post_delete, m2m_changed
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from core.authentication import token_cache
+from core.cache import bump_user_version
+from core.db import close_unusable_connections
+from core import stats
+from core.models import Tag, Ingredient, Recipe, RecipeStats, \
+                        StoredImage
+from core.search import index_recipes
+
+
+@receiver(request_started)
+def check_connections(sender, **kwargs):
+    """Close broken persistent connections before a request reuses them"""
+    close_unusable_connections()
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Remove a deleted token from the authentication cache"""
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    """Remove a changed user's tokens from the authentication cache"""
+    token_cache.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def bump_new_user_version(sender, instance, created, **kwargs):
+    """Start a new user with a data version no cached entry can match"""
+    if created:
+        bump_user_version(instance.pk)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_recipe_stats(sender, instance, created, **kwargs):
+    """Start a new user with empty recipe statistics"""
+    if created:
+        RecipeStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def bump_owner_version(sender, instance, **kwargs):
+    """Change the owner's data version when a recipe object changes"""
+    bump_user_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_owner_version_related(sender, instance, action, **kwargs):
+    """Change the owner's data version when recipe relations change"""
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_user_version(instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+def index_saved_recipe(sender, instance, created, update_fields=None,
+                       **kwargs):
+    """Update the search index with a saved recipe's title"""
+    if update_fields is None or "title" in update_fields:
+        index_recipes([instance], created=created)
+
+
+def _add_image_reference(name, count):
+    if not name:
+        return
+
+    updated = StoredImage.objects.filter(name=name).update(
+        references=F("references") + count
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                StoredImage.objects.create(
+                    name=name, references=max(count, 0)
+                )
+        except IntegrityError:
+            StoredImage.objects.filter(name=name).update(
+                references=F("references") + count
+            )
+
+
+@receiver(post_init, sender=Recipe)
+def remember_loaded_image(sender, instance, **kwargs):
+    """Remember the image a recipe had when it was loaded"""
+    if "image" not in instance.get_deferred_fields():
+        instance._loaded_image = instance.image.name
+
+
+@receiver(post_save, sender=Recipe)
+def count_saved_image(sender, instance, **kwargs):
+    """Move the image reference of a recipe whose image changed"""
+    loaded_image = getattr(instance, "_loaded_image", None)
+    if "image" in instance.get_deferred_fields():
+        return
+    if instance.image.name != loaded_image:
+        _add_image_reference(instance.image.name, 1)
+        _add_image_reference(loaded_image, -1)
+        instance._loaded_image = instance.image.name
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_image(sender, instance, **kwargs):
+    """Release the image reference of a deleted recipe"""
+    _add_image_reference(getattr(instance, "_loaded_image", None), -1)
+
+
+@receiver(post_init, sender=Recipe)
+def remember_loaded_stats(sender, instance, **kwargs):
+    """Remember the counted values a recipe had when it was loaded"""
+    deferred = instance.get_deferred_fields()
+    if instance.pk is not None and \
+            not deferred & {"time_minutes", "price"}:
+        instance._loaded_stats = (
+            instance.time_minutes, stats.to_price(instance.price)
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def count_saved_recipe(sender, instance, created, update_fields=None,
+                       raw=False, **kwargs):
+    """Add a created recipe to the statistics or move a changed one"""
+    if raw or update_fields is not None and \
+            not {"time_minutes", "price"} & set(update_fields):
+        return
+
+    loaded = getattr(instance, "_loaded_stats", None)
+    if created:
+        stats.apply(instance.user_id, **stats.recipe_counts([instance]))
+    elif loaded is None:
+        # The previous values were never loaded, so they cannot be removed
+        stats.rebuild(instance.user_id)
+    else:
+        changes = stats.recipe_counts([instance])
+        previous = stats.recipe_counts(
+            [Recipe(time_minutes=loaded[0], price=loaded[1])], sign=-1
+        )
+        changes["counts"].update(previous["counts"])
+        stats.apply(
+            instance.user_id,
+            time_minutes=changes["time_minutes"] + previous["time_minutes"],
+            price=changes["price"] + previous["price"],
+            counts=changes["counts"],
+        )
+
+    instance._loaded_stats = (
+        instance.time_minutes, stats.to_price(instance.price)
+    )
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_deleted_stats(sender, instance, **kwargs):
+    """Collect what a recipe counts for before its relations are deleted"""
+    changes = stats.recipe_counts([instance], sign=-1)
+    changes["counts"].subtract(stats.related_counts([instance.id]))
+    instance._deleted_stats = changes
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_recipe(sender, instance, **kwargs):
+    """Remove a deleted recipe from the statistics"""
+    changes = getattr(instance, "_deleted_stats", None)
+    if changes is not None:
+        stats.apply(instance.user_id, **changes)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_related_stats(sender, instance, action, reverse, pk_set, **kwargs):
+    """Count the recipes of tags and ingredients as relations change"""
+    field_name, dimension = stats.dimension_of(sender)
+    through = getattr(Recipe, field_name)
+    column = through.field.m2m_reverse_name()
+
+    if action in ("pre_remove", "pre_clear"):
+        # Removing sends the requested ids, count only the existing ones
+        links = through.through.objects.all()
+        if reverse:
+            links = links.filter(**{column: instance.id})
+            if pk_set is not None:
+                links = links.filter(recipe_id__in=pk_set)
+            instance._removed_stats = {(dimension, instance.id): links.count()}
+        else:
+            links = links.filter(recipe_id=instance.id)
+            if pk_set is not None:
+                links = links.filter(**{f"{column}__in": pk_set})
+            instance._removed_stats = Counter(
+                (dimension, key)
+                for key in links.values_list(column, flat=True)
+            )
+    elif action in ("post_remove", "post_clear"):
+        removed = getattr(instance, "_removed_stats", {})
+        stats.apply(instance.user_id, counts={
+            key: -count for key, count in removed.items()
+        })
+    elif action == "post_add" and pk_set:
+        stats.apply(instance.user_id, counts=(
+            {(dimension, instance.id): len(pk_set)} if reverse
+            else {(dimension, key): 1 for key in pk_set}
+        ))
@@ -0,0 +1,151 @@
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class SlowQueryLog:
+    """Log queries slower than a threshold with their EXPLAIN plan
+
+    Plans are captured and written by a background thread, the same
+    statement is logged at most once per cooldown and queries are dropped
+    while the queue is full, so logging does not slow down requests.
+    """
+
+    def __init__(self, threshold=0.5, explain=True, analyze=False,
+                 cooldown=60, queue_size=100, asynchronous=True):
+        self.threshold = threshold
+        self.explain = explain
+        self.analyze = analyze
+        self.cooldown = cooldown
+        self.asynchronous = asynchronous
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._logged = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _allow(self, sql):
+        """Return whether a statement is out of its cooldown"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._logged.get(sql, -self.cooldown) < self.cooldown:
+                return False
+            if len(self._logged) >= 1000:
+                self._logged.clear()
+            self._logged[sql] = now
+
+        return True
+
+    def record(self, alias, sql, params, duration, view):
+        """Queue a slow query to be explained and logged"""
+        if not self._allow(sql):
+            return
+
+        entry = (alias, sql, params, duration, view)
+        if not self.asynchronous:
+            self.write(*entry)
+            return
+
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            return
+        self._start()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._work, name="slow-query-log", daemon=True
+                )
+                self._thread.start()
+
+    def _work(self):
+        while True:
+            entry = self._queue.get()
+            try:
+                self.write(*entry)
+            except Exception:
+                logger.exception("Could not log a slow query")
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+    def plan(self, alias, sql, params):
+        """Return the EXPLAIN plan of a SELECT statement, or None"""
+        if not self.explain or not sql.lstrip().upper().startswith("SELECT"):
+            return None
+
+        connection = connections[alias]
+        options = {"analyze": True} if self.analyze else {}
+        try:
+            prefix = connection.ops.explain_query_prefix(**options)
+            with connection.cursor() as cursor:
+                cursor.execute(f"{prefix} {sql}", params)
+                return "\n".join(
+                    " ".join(str(column) for column in row)
+                    for row in cursor.fetchall()
+                )
+        except Exception as error:
+            return f"EXPLAIN failed: {error}"
+
+    def write(self, alias, sql, params, duration, view):
+        """Log a slow query with its plan"""
+        plan = self.plan(alias, sql, params)
+        logger.warning(
+            "Slow query (%.1f ms) in %s on %s: %s\nParams: %r%s",
+            duration * 1000, view, alias, sql, params,
+            f"\nPlan:\n{plan}" if plan else "",
+        )
+
+
+slow_query_log = SlowQueryLog(
+    threshold=settings.SLOW_QUERY_LOG["THRESHOLD"],
+    explain=settings.SLOW_QUERY_LOG["EXPLAIN"],
+    analyze=settings.SLOW_QUERY_LOG["ANALYZE"],
+    cooldown=settings.SLOW_QUERY_LOG["COOLDOWN"],
+    queue_size=settings.SLOW_QUERY_LOG["QUEUE_SIZE"],
+)
+
+
+class SlowQueryWrapper:
+    """Database execute wrapper passing slow queries to the log"""
+
+    def __init__(self, log, alias, request):
+        self.log = log
+        self.alias = alias
+        self.request = request
+        self.recording = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.recording:
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            if duration >= self.log.threshold and not many:
+                self.record(sql, params, duration)
+
+    def record(self, sql, params, duration):
+        resolver_match = getattr(self.request, "resolver_match", None)
+        self.recording = True
+        try:
+            self.log.record(
+                self.alias,
+                sql,
+                tuple(params) if params is not None else None,
+                duration,
+                resolver_match.view_name if resolver_match
+                else self.request.path,
+            )
+        finally:
+            self.recording = False
@@ -0,0 +1,126 @@
+"""Measure the import time and first request time of a fresh process
+
+Run as ``python -m core.startup [path]``; it prints the measurements as
+JSON. Django is only imported once the import timer is installed, so
+this module must not import it at the top level.
+"""
+import importlib.abc
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """Meta path finder timing the execution of every imported module"""
+
+    def __init__(self):
+        self.timings = {}
+        self._stack = []
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and \
+                    hasattr(spec.loader, "exec_module"):
+                spec.loader = TimedLoader(self, spec.loader)
+            return spec
+
+        return None
+
+    def time(self, name, exec_module, module):
+        self._stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            exec_module(module)
+        finally:
+            total = time.perf_counter() - started
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += total
+            self.timings[name] = (total - children, total)
+
+
+class TimedLoader(importlib.abc.Loader):
+    """Loader timing the module execution of another loader"""
+
+    def __init__(self, timer, loader):
+        self.timer = timer
+        self.loader = loader
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        module.__spec__.loader = self.loader
+        module.__loader__ = self.loader
+        self.timer.time(module.__name__, self.loader.exec_module, module)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+
+def profile(path):
+    """Return the import timings and the time taken to serve a request"""
+    timer = ImportTimer()
+    sys.meta_path.insert(0, timer)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+
+    started = time.perf_counter()
+    import django
+    django.setup()
+    setup = time.perf_counter() - started
+
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+    from wsgiref.util import setup_testing_defaults
+
+    application = get_wsgi_application()
+    loaded = time.perf_counter() - started
+    setup_modules = set(sys.modules)
+
+    settings.ALLOWED_HOSTS = ["*"]
+    environ = {"PATH_INFO": path}
+    setup_testing_defaults(environ)
+    statuses = []
+    response = application(
+        environ, lambda status, headers: statuses.append(status)
+    )
+    b"".join(response)
+    response.close()
+    first_request = time.perf_counter() - started
+    sys.meta_path.remove(timer)
+
+    return {
+        "setup": setup,
+        "application": loaded,
+        "first_request": first_request,
+        "status": statuses[0],
+        "setup_modules": sorted(setup_modules),
+        "modules": {
+            name: {"self": own, "total": total}
+            for name, (own, total) in timer.timings.items()
+        },
+    }
+
+
+def run(path):
+    """Profile the start up of a fresh Python process serving path"""
+    result = subprocess.run(
+        [sys.executable, "-m", "core.startup", path],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+
+    return json.loads(result.stdout.decode())
+
+
+if __name__ == "__main__":
+    json.dump(profile(sys.argv[1] if len(sys.argv) > 1 else "/"), sys.stdout)
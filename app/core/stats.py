@@ -0,0 +1,308 @@
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from core.models import Tag, Ingredient, Recipe, RecipeStats, \
+                        RecipeStatsCount
+
+
+TAG = "tag"
+INGREDIENT = "ingredient"
+RELATED_DIMENSIONS = (
+    ("tags", TAG),
+    ("ingredients", INGREDIENT),
+)
+RELATED_MODELS = {TAG: Tag, INGREDIENT: Ingredient}
+CENT = Decimal("0.01")
+
+
+def to_price(value):
+    """Return a price as a Decimal with two decimal places"""
+    return Decimal(str(value)).quantize(CENT)
+
+
+def price_range(price):
+    """Return the index of the price range a price falls in"""
+    return bisect_right(settings.RECIPE_STATS_PRICE_RANGES, price)
+
+
+def price_ranges():
+    """Return the (min, max) bounds of every price range"""
+    bounds = (None,) + tuple(settings.RECIPE_STATS_PRICE_RANGES) + (None,)
+    return list(zip(bounds, bounds[1:]))
+
+
+def dimension_of(through):
+    """Return the field name and dimension of a recipe through model"""
+    for field_name, dimension in RELATED_DIMENSIONS:
+        if getattr(Recipe, field_name).through is through:
+            return field_name, dimension
+
+
+def related_counts(recipe_ids, field_name=None):
+    """Return the number of the recipes per tag and per ingredient"""
+    counts = Counter()
+    for name, dimension in RELATED_DIMENSIONS:
+        if field_name not in (None, name):
+            continue
+        through = getattr(Recipe, name).through
+        column = getattr(Recipe, name).field.m2m_reverse_name()
+        rows = through.objects.filter(recipe_id__in=recipe_ids).values(
+            column
+        ).annotate(count=Count("id"))
+        for row in rows:
+            counts[dimension, row[column]] += row["count"]
+
+    return counts
+
+
+def recipe_counts(recipes, sign=1):
+    """Return the changes to the totals and counts for recipes"""
+    time_minutes, price, counts = 0, Decimal(0), Counter()
+    for recipe in recipes:
+        recipe_price = to_price(recipe.price)
+        time_minutes += recipe.time_minutes
+        price += recipe_price
+        counts[RecipeStatsCount.PRICE, price_range(recipe_price)] += 1
+
+    return {
+        "recipes": sign * len(recipes),
+        "time_minutes": sign * time_minutes,
+        "price": sign * price,
+        "counts": Counter({
+            key: sign * value for key, value in counts.items()
+        }),
+    }
+
+
+def _add_recipe_counts(counts):
+    """Add changes to the recipe counts of tags and ingredients"""
+    groups = defaultdict(list)
+    for (dimension, key), change in counts.items():
+        groups[dimension, change].append(key)
+
+    for (dimension, change), keys in groups.items():
+        RELATED_MODELS[dimension].objects.filter(id__in=keys).update(
+            recipe_count=F("recipe_count") + change
+        )
+
+
+def _add_counts(user_id, counts):
+    """Add changes to counts with one UPDATE per dimension and change"""
+    groups = defaultdict(list)
+    for (dimension, key), change in counts.items():
+        groups[dimension, change].append(key)
+
+    for (dimension, change), keys in groups.items():
+        RecipeStatsCount.objects.filter(
+            user_id=user_id, dimension=dimension, key__in=keys
+        ).update(count=F("count") + change)
+
+
+def _create_counts(user_id, counts):
+    """Create count rows, adding to the ones created concurrently"""
+    try:
+        with transaction.atomic():
+            RecipeStatsCount.objects.bulk_create([
+                RecipeStatsCount(
+                    user_id=user_id, dimension=dimension, key=key, count=change
+                )
+                for (dimension, key), change in counts.items()
+            ])
+        return
+    except IntegrityError:
+        pass
+
+    for (dimension, key), change in counts.items():
+        lookup = {"user_id": user_id, "dimension": dimension, "key": key}
+        if RecipeStatsCount.objects.filter(**lookup).update(
+            count=F("count") + change
+        ):
+            continue
+        try:
+            with transaction.atomic():
+                RecipeStatsCount.objects.create(count=change, **lookup)
+        except IntegrityError:
+            RecipeStatsCount.objects.filter(**lookup).update(
+                count=F("count") + change
+            )
+
+
+def apply(user_id, recipes=0, time_minutes=0, price=0, counts=None):
+    """Add changes to a user's recipe totals and counts"""
+    if recipes or time_minutes or price:
+        RecipeStats.objects.filter(user_id=user_id).update(
+            recipes=F("recipes") + recipes,
+            time_minutes=F("time_minutes") + time_minutes,
+            price=F("price") + price,
+        )
+
+    counts = {key: change for key, change in (counts or {}).items() if change}
+    _add_recipe_counts({
+        key: counts.pop(key) for key in list(counts)
+        if key[0] in RELATED_MODELS
+    })
+    # Only increments create rows, so deleting a user cannot recreate the
+    # rows of its cascaded recipes
+    increments = [key for key, change in counts.items() if change > 0]
+    if increments:
+        existing = set(RecipeStatsCount.objects.filter(
+            user_id=user_id,
+            dimension__in={dimension for dimension, _ in increments},
+            key__in={key for _, key in increments},
+        ).values_list("dimension", "key"))
+        missing = [key for key in increments if key not in existing]
+        if missing:
+            _create_counts(user_id, {key: counts.pop(key) for key in missing})
+
+    _add_counts(user_id, counts)
+
+
+def compute(user_id):
+    """Return a user's totals and counts computed from their recipes"""
+    recipes = Recipe.objects.filter(user_id=user_id)
+    totals = recipes.aggregate(
+        recipes=Count("id"),
+        time_minutes=Sum("time_minutes"),
+        price=Sum("price"),
+    )
+    counts = related_counts(recipes.values("id"))
+    for price in recipes.values_list("price", flat=True).iterator():
+        counts[RecipeStatsCount.PRICE, price_range(price)] += 1
+
+    return {
+        "recipes": totals["recipes"],
+        "time_minutes": totals["time_minutes"] or 0,
+        "price": to_price(totals["price"] or 0),
+        "counts": counts,
+    }
+
+
+def stored(user_id, related=True):
+    """Return a user's maintained totals and counts"""
+    totals = RecipeStats.objects.filter(user_id=user_id).values(
+        "recipes", "time_minutes", "price"
+    ).first() or {"recipes": 0, "time_minutes": 0, "price": Decimal(0)}
+    counts = Counter({
+        (dimension, key): count
+        for dimension, key, count in RecipeStatsCount.objects.filter(
+            user_id=user_id
+        ).exclude(count=0).values_list("dimension", "key", "count")
+    })
+    if related:
+        for dimension, model in RELATED_MODELS.items():
+            counts.update({
+                (dimension, key): count
+                for key, count in model.objects.filter(
+                    user_id=user_id
+                ).exclude(recipe_count=0).values_list("id", "recipe_count")
+            })
+
+    return dict(totals, price=to_price(totals["price"]), counts=counts)
+
+
+def recount_related(queryset, field_name):
+    """Recompute the recipe counts of tags or ingredients"""
+    through = getattr(Recipe, field_name).through
+    column = getattr(Recipe, field_name).field.m2m_reverse_name()
+    links = through.objects.filter(**{column: OuterRef("id")}).order_by()
+
+    return queryset.update(recipe_count=Coalesce(
+        Subquery(
+            links.values(column).annotate(count=Count("id")).values("count")
+        ),
+        0,
+    ))
+
+
+def rebuild(user_id):
+    """Recompute a user's totals and counts from scratch"""
+    computed = compute(user_id)
+    with transaction.atomic():
+        RecipeStats.objects.update_or_create(
+            user_id=user_id,
+            defaults={
+                "recipes": computed["recipes"],
+                "time_minutes": computed["time_minutes"],
+                "price": computed["price"],
+            },
+        )
+        RecipeStatsCount.objects.filter(user_id=user_id).delete()
+        RecipeStatsCount.objects.bulk_create(
+            [
+                RecipeStatsCount(
+                    user_id=user_id, dimension=dimension, key=key, count=count
+                )
+                for (dimension, key), count in computed["counts"].items()
+                if dimension not in RELATED_MODELS
+            ],
+            batch_size=500,
+        )
+        for field_name, dimension in RELATED_DIMENSIONS:
+            recount_related(
+                RELATED_MODELS[dimension].objects.filter(user_id=user_id),
+                field_name,
+            )
+
+    return computed
+
+
+def differences(user_id):
+    """Return the maintained values that differ from computed ones"""
+    computed, current = compute(user_id), stored(user_id)
+    changed = {
+        name: (current[name], computed[name])
+        for name in ("recipes", "time_minutes", "price")
+        if current[name] != computed[name]
+    }
+    for key in set(computed["counts"]) | set(current["counts"]):
+        if current["counts"][key] != computed["counts"][key]:
+            changed[key] = (current["counts"][key], computed["counts"][key])
+
+    return changed
+
+
+def summary(user):
+    """Return a user's recipe statistics for the API"""
+    current = stored(user.id, related=False)
+    count = current["recipes"]
+
+    average_time_minutes = average_price = None
+    if count:
+        average_time_minutes = round(current["time_minutes"] / count, 1)
+        average_price = to_price(current["price"] / count)
+
+    return {
+        "recipes": count,
+        "average_time_minutes": average_time_minutes,
+        "average_price": average_price,
+        "price_ranges": [
+            {
+                "min": minimum,
+                "max": maximum,
+                "recipes": current["counts"][RecipeStatsCount.PRICE, index],
+            }
+            for index, (minimum, maximum) in enumerate(price_ranges())
+        ],
+        "tags": [
+            {"id": tag.id, "name": tag.name, "recipes": tag.recipe_count}
+            for tag in Tag.objects.filter(
+                user=user, recipe_count__gt=0
+            ).order_by("name")
+        ],
+        "ingredients": [
+            {
+                "id": ingredient.id,
+                "name": ingredient.name,
+                "recipes": ingredient.recipe_count,
+            }
+            for ingredient in Ingredient.objects.filter(
+                user=user, recipe_count__gt=0
+            ).order_by("name")
+        ],
+    }
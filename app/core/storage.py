@@ -0,0 +1,47 @@
+import hashlib
+import os
+import re
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+CONTENT_ADDRESSED_NAME = re.compile(r"(^|/)[0-9a-f]{64}(_\d+)?\.\w+$")
+
+
+def variant_name(name, size):
+    """Return the storage name of an image variant of the given size"""
+    root, ext = os.path.splitext(name)
+
+    return f"{root}_{size}{ext}"
+
+
+def is_content_addressed(name):
+    """Return whether a storage name is derived from the file content"""
+    return bool(CONTENT_ADDRESSED_NAME.search(name))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage naming files by the SHA-256 of their content
+
+    Saving content that is already stored returns the existing name
+    instead of writing a copy.
+    """
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+
+        directory, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        name = os.path.join(directory, f"{digest.hexdigest()}{ext}")
+
+        if self.exists(name):
+            return name
+
+        return super()._save(name, content)
+
+
+recipe_image_storage = ContentAddressedStorage()
@@ -0,0 +1,133 @@
+import json
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Task
+
+
+_registry = {}
+
+
+def task(name):
+    """Register a function to be run by name from the task queue"""
+    def register(func):
+        _registry[name] = func
+        return func
+
+    return register
+
+
+def enqueue(name, *args, delay=0, max_attempts=None, **kwargs):
+    """Queue a registered function to be run by a worker"""
+    return Task.objects.create(
+        name=name,
+        payload=json.dumps({"args": args, "kwargs": kwargs}),
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.TASK_MAX_ATTEMPTS,
+    )
+
+
+def requeue_stale():
+    """Queue again the tasks whose worker stopped without finishing them"""
+    cutoff = timezone.now() - timedelta(seconds=settings.TASK_LOCK_TIMEOUT)
+
+    return Task.objects.filter(
+        status=Task.RUNNING,
+        locked_at__lt=cutoff,
+    ).update(status=Task.QUEUED, locked_at=None, locked_by="")
+
+
+def delete_finished(batch_size=1000):
+    """Delete the tasks that finished more than TASK_RETENTION ago"""
+    cutoff = timezone.now() - timedelta(seconds=settings.TASK_RETENTION)
+    finished = Task.objects.filter(
+        status__in=(Task.DONE, Task.FAILED),
+        finished_at__lt=cutoff,
+    )
+
+    deleted = 0
+    while True:
+        ids = list(finished.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Task.objects.filter(id__in=ids).delete()[0]
+
+
+def claim(worker):
+    """Lock the next due task for a worker and return it, or None
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED where the database supports it
+    and otherwise a conditional UPDATE that only one worker can win.
+    """
+    now = timezone.now()
+    due = Task.objects.filter(
+        status=Task.QUEUED,
+        run_at__lte=now,
+    ).order_by("run_at", "id")
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            claimed = due.select_for_update(skip_locked=True).first()
+            if claimed is None:
+                return None
+            claimed.status = Task.RUNNING
+            claimed.attempts += 1
+            claimed.locked_at = now
+            claimed.locked_by = worker
+            claimed.save(update_fields=[
+                "status", "attempts", "locked_at", "locked_by"
+            ])
+
+            return claimed
+
+    for task_id in due.values_list("id", flat=True)[:10]:
+        updated = Task.objects.filter(
+            id=task_id,
+            status=Task.QUEUED,
+        ).update(
+            status=Task.RUNNING,
+            attempts=F("attempts") + 1,
+            locked_at=now,
+            locked_by=worker,
+        )
+        if updated:
+            return Task.objects.get(id=task_id)
+
+    return None
+
+
+def run(claimed):
+    """Run a claimed task, scheduling a retry with backoff if it fails"""
+    try:
+        func = _registry[claimed.name]
+        payload = json.loads(claimed.payload)
+        func(*payload["args"], **payload["kwargs"])
+    except Exception:
+        claimed.last_error = traceback.format_exc()
+        if claimed.attempts >= claimed.max_attempts:
+            claimed.status = Task.FAILED
+            claimed.finished_at = timezone.now()
+        else:
+            claimed.status = Task.QUEUED
+            claimed.run_at = timezone.now() + timedelta(
+                seconds=settings.TASK_RETRY_BACKOFF * 2 ** (
+                    claimed.attempts - 1
+                )
+            )
+    else:
+        claimed.status = Task.DONE
+        claimed.finished_at = timezone.now()
+
+    claimed.locked_at = None
+    claimed.locked_by = ""
+    claimed.save(update_fields=[
+        "status", "run_at", "locked_at", "locked_by", "last_error",
+        "finished_at",
+    ])
+
+    return claimed
@@ -0,0 +1,121 @@
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.authentication import token_cache, TokenUserCache
+
+import app.utils as utils
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test the cached token authentication"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = utils.create_user(**utils.USER_PAYLOAD)
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_token_lookup_cached(self):
+        """Test the token is only looked up on the first request"""
+        with self.assertNumQueries(2):
+            self.client.get(utils.RECIPES_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(utils.RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(token_cache.stats()["hits"], 1)
+        self.assertEqual(token_cache.stats()["misses"], 1)
+
+    def test_lookups_recorded_in_metrics(self):
+        """Test cache hits and misses are exported as metrics"""
+        metrics.registry.clear()
+        self.client.get(utils.RECIPES_URL)
+        self.client.get(utils.RECIPES_URL)
+
+        content = metrics.registry.render()
+
+        self.assertIn(
+            'auth_token_cache_requests_total{result="hit"} 1', content
+        )
+        self.assertIn(
+            'auth_token_cache_requests_total{result="miss"} 1', content
+        )
+
+    def test_deleted_token_invalidated(self):
+        """Test a deleted token is no longer accepted"""
+        self.client.get(utils.TAGS_URL)
+        self.token.delete()
+
+        res = self.client.get(utils.TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_invalidated(self):
+        """Test a deactivated user is no longer accepted"""
+        self.client.get(utils.TAGS_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(utils.TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updated_user_invalidated(self):
+        """Test updating the user returns the updated user afterwards"""
+        self.client.get(utils.ME_URL)
+        self.client.patch(utils.ME_URL, {"name": "New name"})
+
+        res = self.client.get(utils.ME_URL)
+
+        self.assertEqual(res.data["name"], "New name")
+
+
+class TokenUserCacheTests(TestCase):
+    """Test the token user cache"""
+
+    def test_least_recently_used_evicted(self):
+        """Test the least recently used entry is evicted when full"""
+        cache = TokenUserCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_expired_entry_missed(self):
+        """Test an entry is missed after its time to live"""
+        cache = TokenUserCache(ttl=-1)
+        cache.set("a", 1)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_shared_cache_invalidated_for_all_processes(self):
+        """Test an entry removed in one process is gone in the others"""
+        cache = TokenUserCache(cache_alias="default")
+        other = TokenUserCache(cache_alias="default")
+        cache.set("a", 1)
+        other.invalidate("a")
+
+        self.assertIsNone(cache.get("a"))
+
+    def test_local_cache_stale_in_other_processes(self):
+        """Test without a cache alias other processes keep their entry"""
+        cache = TokenUserCache()
+        other = TokenUserCache()
+        cache.set("a", 1)
+        other.invalidate("a")
+
+        self.assertEqual(cache.get("a"), 1)
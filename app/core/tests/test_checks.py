@@ -0,0 +1,24 @@
+from django.test import SimpleTestCase, override_settings
+
+from core.checks import check_shared_user_cache
+
+
+class CheckTests(SimpleTestCase):
+    """Test the deployment checks"""
+
+    @override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }})
+    def test_local_user_cache_warned(self):
+        """Test a per-process user cache is reported"""
+        warnings = check_shared_user_cache(None)
+
+        self.assertEqual([warning.id for warning in warnings], ["core.W001"])
+
+    @override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+        "LOCATION": "memcached:11211",
+    }})
+    def test_shared_user_cache_accepted(self):
+        """Test a memcached user cache passes"""
+        self.assertEqual(check_shared_user_cache(None), [])
@@ -1,23 +1,195 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core import models, stats
+
+import app.utils as utils
+
+
+ENSURE_CONNECTION = \
+    "django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection"
+MIGRATION_PLAN = \
+    "django.db.migrations.executor.MigrationExecutor.migration_plan"
+
 
 class CommandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         """Testing waiting for db when db is available"""
-        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
-            gi.return_value = True
-            call_command("wait_for_db")
-            self.assertEqual(gi.call_count, 1)
+        with patch(ENSURE_CONNECTION) as ec:
+            call_command("wait_for_db", stdout=StringIO())
+            self.assertEqual(ec.call_count, 1)
 
     @patch("time.sleep", return_value=True)
     def test_wait_for_db(self, ts):
         """Test waiting for db"""
-        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command("wait_for_db")
-            self.assertEqual(gi.call_count, 6)
+        with patch(ENSURE_CONNECTION) as ec:
+            ec.side_effect = [OperationalError] * 5 + [None]
+            call_command("wait_for_db", stdout=StringIO())
+            self.assertEqual(ec.call_count, 6)
+
+        delays = [call[0][0] for call in ts.call_args_list]
+        self.assertEqual(delays, sorted(delays))
+        self.assertGreater(delays[-1], delays[0])
+
+    @patch("time.sleep", return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """Test giving up waiting for db after the timeout"""
+        with patch(ENSURE_CONNECTION) as ec:
+            ec.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                call_command("wait_for_db", timeout=0, stdout=StringIO())
+
+    @patch("time.sleep", return_value=True)
+    def test_wait_for_migrations(self, ts):
+        """Test waiting until migrations are applied"""
+        with patch(MIGRATION_PLAN) as mp:
+            mp.side_effect = [[("migration", False)], []]
+            call_command("wait_for_db", migrations=True, stdout=StringIO())
+            self.assertEqual(mp.call_count, 2)
+
+
+class GcImagesCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = utils.create_user(**utils.USER_PAYLOAD)
+        self.recipe = utils.create_recipe(self.user)
+        self.recipe.image.save("photo.jpg", ContentFile(b"image"))
+        self.storage = models.recipe_image_storage
+
+    def tearDown(self):
+        self.storage.delete(self.recipe.image.name)
+
+    def test_unreferenced_image_deleted(self):
+        """Test an image no recipe references is deleted"""
+        name = self.recipe.image.name
+        self.recipe.delete()
+
+        call_command("gc_images", grace_minutes=-1, stdout=StringIO())
+
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(models.StoredImage.objects.exists())
+
+    def test_referenced_image_kept(self):
+        """Test an image referenced by a recipe is kept"""
+        call_command("gc_images", grace_minutes=-1, stdout=StringIO())
+
+        self.assertTrue(self.storage.exists(self.recipe.image.name))
+
+
+class ImportRecipesCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = utils.create_user(**utils.USER_PAYLOAD)
+        utils.create_tag(self.user, "Vegan")
+
+    def import_file(self, content, suffix, **options):
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=suffix, delete=False
+        ) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            "import_recipes", file.name, user=self.user.email,
+            stdout=stdout, stderr=stderr, **options
+        )
+
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_jsonl(self):
+        """Test importing recipes from JSON lines reuses existing tags"""
+        rows = [
+            {"title": f"Recipe {index}", "time_minutes": 5, "price": "5.50",
+             "tags": ["Vegan", "Quick"], "ingredients": ["Salt"]}
+            for index in range(5)
+        ]
+        content = "\n".join(json.dumps(row) for row in rows)
+
+        stdout, _ = self.import_file(content, ".jsonl", chunk_size=2)
+
+        self.assertIn("Imported 5 recipes, skipped 0 rows", stdout)
+        recipes = models.Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 5)
+        self.assertEqual(
+            sorted(models.Tag.objects.values_list("name", flat=True)),
+            ["Quick", "Vegan"],
+        )
+        self.assertEqual(models.Ingredient.objects.count(), 1)
+        for recipe in recipes:
+            self.assertEqual(recipe.tags.count(), 2)
+            self.assertEqual(recipe.ingredients.count(), 1)
+
+    def test_import_csv_skips_invalid_rows(self):
+        """Test importing recipes from CSV reports invalid rows"""
+        content = (
+            "title,time_minutes,price,link,tags,ingredients\n"
+            "Soup,10,4.00,,Vegan|Warm,Water|Salt\n"
+            "Broken,soon,4.00,,,\n"
+        )
+
+        stdout, stderr = self.import_file(content, ".csv")
+
+        self.assertIn("Imported 1 recipes, skipped 1 rows", stdout)
+        self.assertIn("Line 3: time_minutes", stderr)
+        recipe = models.Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.title, "Soup")
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(recipe.ingredients.count(), 2)
+
+
+class BenchCommandTests(TestCase):
+
+    def test_bench_saves_results(self):
+        """Test the benchmark reports every endpoint and cleans up"""
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            call_command(
+                "bench", users=2, recipes=5, tags=3, ingredients=3,
+                requests=40, output=output.name, stdout=StringIO(),
+                stderr=StringIO(),
+            )
+            results = json.load(output)
+
+        self.assertEqual(results["total"]["requests"], 40)
+        self.assertIn("recipe-list", results["endpoints"])
+        for summary in results["endpoints"].values():
+            self.assertLessEqual(summary["p50_ms"], summary["p99_ms"])
+            self.assertGreater(summary["queries"], 0)
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class RebuildRecipeStatsCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = utils.create_user(**utils.USER_PAYLOAD)
+        recipe = utils.create_recipe(self.user)
+        recipe.tags.add(utils.create_tag(self.user, "Vegan"))
+        models.RecipeStats.objects.filter(user=self.user).update(recipes=5)
+        models.RecipeStatsCount.objects.filter(user=self.user).delete()
+
+    def test_check_reports_differences(self):
+        """Test the consistency check reports wrong statistics"""
+        stdout = StringIO()
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_recipe_stats", check=True, stdout=stdout)
+
+        self.assertIn("recipes is 5, expected 1", stdout.getvalue())
+
+    def test_rebuild_fixes_differences(self):
+        """Test rebuilding recomputes the statistics from scratch"""
+        call_command("rebuild_recipe_stats", stdout=StringIO())
+
+        self.assertEqual(stats.differences(self.user.id), {})
+        call_command("rebuild_recipe_stats", check=True, stdout=StringIO())
@@ -0,0 +1,37 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+
+from core.db import close_unusable_connections
+
+
+@override_settings(DB_HEALTH_CHECK=True)
+class ConnectionHealthCheckTests(TransactionTestCase):
+    """Test closing broken persistent connections"""
+
+    def setUp(self):
+        connection.ensure_connection()
+
+    def test_unusable_connection_closed(self):
+        """Test that a connection failing its check is closed"""
+        with patch.object(connection, "is_usable", return_value=False), \
+                patch.object(connection, "close") as close:
+            close_unusable_connections()
+
+        close.assert_called_once_with()
+
+    def test_usable_connection_kept(self):
+        """Test that a working connection is reused"""
+        with patch.object(connection, "close") as close:
+            close_unusable_connections()
+
+        close.assert_not_called()
+
+    @override_settings(DB_HEALTH_CHECK=False)
+    def test_check_disabled(self):
+        """Test that connections are not checked when disabled"""
+        with patch.object(connection, "is_usable") as is_usable:
+            close_unusable_connections()
+
+        is_usable.assert_not_called()
@@ -0,0 +1,104 @@
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+import app.utils as utils
+
+
+class MediaViewTests(TestCase):
+    """Test serving recipe images"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = utils.create_user(**utils.USER_PAYLOAD)
+        self.user2 = utils.create_user(**utils.USER_PAYLOAD_UPDATE)
+        self.client.force_authenticate(self.user)
+        self.recipe = utils.create_recipe(self.user)
+        self.recipe.image.save("photo.jpg", ContentFile(b"0123456789"))
+        self.url = utils.media_url(self.recipe.image.name)
+
+    def tearDown(self):
+        self.recipe.image.delete()
+
+    def _content(self, res):
+        # Not closed: closing sends request_finished, which closes the
+        # database connection of the test transaction
+        return b"".join(res.streaming_content)
+
+    def test_auth_required(self):
+        """Test that authentication is required"""
+        res = APIClient().get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_serve_own_image(self):
+        """Test serving an image of the user's recipe"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._content(res), b"0123456789")
+        self.assertEqual(res["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", res["Cache-Control"])
+
+    def test_other_users_image_not_found(self):
+        """Test images of other users' recipes are not served"""
+        self.client.force_authenticate(self.user2)
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_serve_range(self):
+        """Test serving a byte range of an image"""
+        res = self.client.get(self.url, HTTP_RANGE="bytes=2-5")
+
+        self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(self._content(res), b"2345")
+        self.assertEqual(res["Content-Range"], "bytes 2-5/10")
+        self.assertEqual(res["Content-Length"], "4")
+
+    def test_serve_suffix_range(self):
+        """Test serving the last bytes of an image"""
+        res = self.client.get(self.url, HTTP_RANGE="bytes=-3")
+
+        self.assertEqual(self._content(res), b"789")
+
+    def test_range_not_satisfiable(self):
+        """Test a range past the end of the image is rejected"""
+        res = self.client.get(self.url, HTTP_RANGE="bytes=20-")
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        self.assertEqual(res["Content-Range"], "bytes */10")
+
+    def test_range_ignored_for_stale_if_range(self):
+        """Test the full image is served when If-Range does not match"""
+        res = self.client.get(
+            self.url, HTTP_RANGE="bytes=2-5", HTTP_IF_RANGE='"stale"'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._content(res), b"0123456789")
+
+    def test_not_modified(self):
+        """Test a request with a current ETag returns 304"""
+        res = self.client.get(self.url)
+        self._content(res)
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=res["ETag"])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(MEDIA_ACCEL="x-accel-redirect")
+    def test_accel_redirect(self):
+        """Test the transfer is handed to the front proxy"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res["X-Accel-Redirect"],
+            "/protected-media/" + self.recipe.image.name
+        )
@@ -0,0 +1,168 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import metrics
+
+import app.utils as utils
+
+
+class MetricsTests(TestCase):
+    """Test recording and serving request metrics"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = utils.create_user(**utils.USER_PAYLOAD)
+        self.client.force_authenticate(self.user)
+        metrics.registry.clear()
+
+    def test_request_recorded_by_route(self):
+        """Test that requests are recorded by their URL name"""
+        utils.create_recipe(self.user)
+        self.client.get(utils.RECIPES_URL)
+
+        res = self.client.get(utils.METRICS_URL)
+        content = res.content.decode()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            'http_requests_total{method="GET",route="recipe:recipe-list",'
+            'status="200"} 1.0',
+            content,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",'
+            'route="recipe:recipe-list"} 1',
+            content,
+        )
+        self.assertIn(
+            'http_request_db_queries_bucket{method="GET",'
+            'route="recipe:recipe-list",le="0"} 0',
+            content,
+        )
+
+    def test_streamed_queries_recorded(self):
+        """Test that a streaming response is recorded once sent"""
+        utils.create_recipe(self.user)
+        res = self.client.get(utils.RECIPES_EXPORT_URL)
+        content = b"".join(res.streaming_content)
+
+        metrics_content = self.client.get(utils.METRICS_URL).content.decode()
+
+        labels = 'method="GET",route="recipe:recipe-export"'
+        self.assertIn(
+            f'http_request_db_queries_bucket{{{labels},le="0"}} 0',
+            metrics_content,
+        )
+        self.assertIn(
+            f"http_response_size_bytes_sum{{{labels}}} {len(content)}",
+            metrics_content,
+        )
+
+    def test_unmatched_route(self):
+        """Test that unresolved URLs share a single route"""
+        self.client.get("/missing/")
+
+        content = self.client.get(utils.METRICS_URL).content.decode()
+
+        self.assertIn('route="unmatched",status="404"', content)
+
+    @override_settings(METRICS={"TOKEN": "secret"})
+    def test_token_required(self):
+        """Test that the configured bearer token is required"""
+        res = self.client.get(utils.METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        res = self.client.get(
+            utils.METRICS_URL, HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_processes_aggregated(self):
+        """Test that values saved by other processes are summed"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        labels = (("route", "recipe:recipe-list"),)
+        registries = [
+            metrics.MetricsRegistry(directory=directory, process_id=pid)
+            for pid in (1, 2)
+        ]
+        for registry in registries:
+            registry.inc("http_requests_total", labels)
+            registry.observe("http_request_db_queries", labels, 3)
+            registry.flush(force=True)
+
+        content = registries[0].render()
+
+        self.assertIn(
+            'http_requests_total{route="recipe:recipe-list"} 2.0', content
+        )
+        self.assertIn(
+            'http_request_db_queries_bucket{route="recipe:recipe-list",'
+            'le="5"} 2',
+            content,
+        )
+
+    def _age(self, directory, process_id, seconds):
+        """Make a process's saved values look older"""
+        path = os.path.join(directory, f"{process_id}.json")
+        modified = time.time() - seconds
+        os.utime(path, (modified, modified))
+
+    def test_stale_process_folded_into_base(self):
+        """Test that a dead process's file is folded once into the totals"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        labels = (("route", "recipe:recipe-list"),)
+        live, dead = [
+            metrics.MetricsRegistry(
+                directory=directory, stale_after=60, process_id=pid
+            )
+            for pid in ("1", "2")
+        ]
+        dead.inc("http_requests_total", labels, 3)
+        dead.flush(force=True)
+        self._age(directory, "2", 120)
+
+        for _ in range(2):
+            content = live.render()
+
+            self.assertIn(
+                'http_requests_total{route="recipe:recipe-list"} 3.0',
+                content
+            )
+        self.assertEqual(
+            sorted(os.listdir(directory)), [".lock", "base.json"]
+        )
+
+    def test_idle_process_not_counted_twice(self):
+        """Test that a folded process only saves values added afterwards"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        labels = (("route", "recipe:recipe-list"),)
+        idle, other = [
+            metrics.MetricsRegistry(
+                directory=directory, stale_after=60, process_id=pid
+            )
+            for pid in ("1", "2")
+        ]
+        idle.inc("http_requests_total", labels, 2)
+        idle.flush(force=True)
+        self._age(directory, "1", 120)
+        other.render()
+
+        idle.inc("http_requests_total", labels)
+        idle.flush(force=True)
+
+        for registry in (idle, other):
+            self.assertIn(
+                'http_requests_total{route="recipe:recipe-list"} 3.0',
+                registry.render()
+            )
@@ -1,5 +1,8 @@
+import hashlib
 from unittest.mock import patch
 
+from django.core.files.base import ContentFile
+from django.db import connection
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -63,3 +66,134 @@ class ModelTests(TestCase):
 
         exp_path = f"uploads/recipe/{uuid}.jpg"
         self.assertEqual(file_path, exp_path)
+
+
+class StoredImageTests(TestCase):
+
+    def setUp(self):
+        self.user = utils.create_user(**utils.USER_PAYLOAD)
+        self.content = b"not really an image"
+        self.name = "uploads/recipe/" + \
+            hashlib.sha256(self.content).hexdigest() + ".jpg"
+
+    def tearDown(self):
+        models.recipe_image_storage.delete(self.name)
+
+    def _set_image(self, recipe):
+        recipe.image.save("photo.JPG", ContentFile(self.content))
+
+    def test_image_named_by_content(self):
+        """Test images are named by their content and stored once"""
+        recipe1 = utils.create_recipe(self.user)
+        recipe2 = utils.create_recipe(self.user)
+        self._set_image(recipe1)
+        self._set_image(recipe2)
+
+        self.assertEqual(recipe1.image.name, self.name)
+        self.assertEqual(recipe2.image.name, self.name)
+        self.assertTrue(models.recipe_image_storage.exists(self.name))
+
+    def test_image_references_counted(self):
+        """Test images count the recipes referencing them"""
+        recipe1 = utils.create_recipe(self.user)
+        recipe2 = utils.create_recipe(self.user)
+        self._set_image(recipe1)
+        self._set_image(recipe2)
+        stored = models.StoredImage.objects.get(name=self.name)
+
+        self.assertEqual(stored.references, 2)
+
+        recipe1.image = None
+        recipe1.save()
+        models.Recipe.objects.get(id=recipe2.id).delete()
+        stored.refresh_from_db()
+
+        self.assertEqual(stored.references, 0)
+
+
+class IndexTests(TestCase):
+
+    def _assert_index(self, model, name, columns):
+        """Assert a model's table has an index on the ordered columns"""
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, model._meta.db_table
+            )
+
+        self.assertIn(name, constraints)
+        self.assertTrue(constraints[name]["index"])
+        self.assertEqual(
+            constraints[name]["columns"],
+            [column.lstrip("-") for column in columns]
+        )
+        self.assertEqual(
+            constraints[name]["orders"],
+            ["DESC" if column.startswith("-") else "ASC" for column in columns]
+        )
+
+    def test_tags_by_user_indexed(self):
+        """Test a user's tags are indexed by name for listing"""
+        self._assert_index(
+            models.Tag, "core_tag_user_name_idx", ["user_id", "-name", "id"]
+        )
+
+    def test_ingredients_by_user_indexed(self):
+        """Test a user's ingredients are indexed by name for listing"""
+        self._assert_index(
+            models.Ingredient,
+            "core_ingredient_user_name_idx",
+            ["user_id", "-name", "id"],
+        )
+
+    def test_tags_by_recipe_count_indexed(self):
+        """Test a user's tags are indexed most used first for listing"""
+        self._assert_index(
+            models.Tag,
+            "core_tag_user_count_idx",
+            ["user_id", "-recipe_count", "id"],
+        )
+
+    def test_ingredients_by_recipe_count_indexed(self):
+        """Test a user's ingredients are indexed most used first"""
+        self._assert_index(
+            models.Ingredient,
+            "core_ingredient_user_count_idx",
+            ["user_id", "-recipe_count", "id"],
+        )
+
+    def test_recipe_links_indexed_by_related(self):
+        """Test recipe links can be found from a tag or ingredient"""
+        for field, column in (("tags", "tag_id"),
+                              ("ingredients", "ingredient_id")):
+            through = getattr(models.Recipe, field).through
+            with connection.cursor() as cursor:
+                constraints = connection.introspection.get_constraints(
+                    cursor, through._meta.db_table
+                )
+
+            self.assertIn([column], [
+                constraint["columns"] for constraint in constraints.values()
+                if constraint["index"]
+            ])
+
+    def test_recipes_by_user_indexed(self):
+        """Test a user's recipes are indexed newest first for listing"""
+        self._assert_index(
+            models.Recipe, "core_recipe_user_id_idx", ["user_id", "-id"]
+        )
+
+    def test_search_tokens_by_user_indexed(self):
+        """Test search tokens are indexed per user for prefix lookups"""
+        self._assert_index(
+            models.RecipeSearchToken,
+            "core_search_user_token_idx",
+            ["user_id", "token"],
+        )
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT indexdef FROM pg_indexes WHERE indexname = %s",
+                    ["core_search_user_token_idx"]
+                )
+                self.assertIn("varchar_pattern_ops", cursor.fetchone()[0])
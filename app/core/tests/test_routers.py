@@ -0,0 +1,106 @@
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+
+import app.utils as utils
+
+
+REPLICA = "replica"
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], REPLICA_PIN_SECONDS=0)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Test routing reads to a replica of the test database"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        connections.databases[REPLICA] = dict(
+            connections["default"].settings_dict
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections.databases[REPLICA]
+        if hasattr(connections._connections, REPLICA):
+            delattr(connections._connections, REPLICA)
+        super().tearDownClass()
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = utils.create_user(**utils.USER_PAYLOAD)
+        self.recipe = utils.create_recipe(self.user)
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user)}"
+        )
+
+    def test_safe_request_reads_replica(self):
+        """Test that a read only request reads from the replica"""
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            res = self.client.get(utils.RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"][0]["id"], self.recipe.id)
+        self.assertTrue(any(
+            "core_recipe" in query["sql"] for query in queries
+        ))
+
+    def test_streamed_export_reads_replica(self):
+        """Test that queries run while streaming read from the replica"""
+        res = self.client.get(utils.RECIPES_EXPORT_URL)
+
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            content = b"".join(res.streaming_content)
+
+        self.assertIn(self.recipe.title.encode(), content)
+        self.assertTrue(any(
+            "core_recipe" in query["sql"] for query in queries
+        ))
+
+    def test_force_authenticated_request_reads_replica(self):
+        """Test that routing does not depend on the authentication class"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            res = client.get(utils.RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(any(
+            "core_recipe" in query["sql"] for query in queries
+        ))
+
+    def test_unauthenticated_request_uses_primary(self):
+        """Test that reads before authentication stay on the primary"""
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            res = APIClient().get(utils.RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(len(queries), 0)
+
+    def test_write_uses_primary(self):
+        """Test that a writing request does not touch the replica"""
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            res = self.client.post(utils.RECIPES_URL, utils.RECIPE_PAYLOAD)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(queries), 0)
+
+    @override_settings(REPLICA_PIN_SECONDS=60)
+    def test_recent_writer_pinned_to_primary(self):
+        """Test that users read their own writes from the primary"""
+        self.client.post(utils.RECIPES_URL, utils.RECIPE_PAYLOAD)
+
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            res = self.client.get(utils.RECIPES_URL)
+
+        self.assertEqual(len(res.data["results"]), 2)
+        self.assertEqual(len(queries), 0)
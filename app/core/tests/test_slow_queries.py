@@ -0,0 +1,64 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from rest_framework.test import APIClient
+
+from core import slow_queries
+
+import app.utils as utils
+
+
+class SlowQueryLogTests(TestCase):
+    """Test logging slow queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = utils.create_user(**utils.USER_PAYLOAD)
+        self.client.force_authenticate(self.user)
+        self.log = slow_queries.SlowQueryLog(threshold=0, asynchronous=False)
+
+    def test_slow_query_logged_with_view_and_plan(self):
+        """Test that slow queries are logged with their view and plan"""
+        utils.create_recipe(self.user)
+
+        with patch.object(slow_queries, "slow_query_log", self.log), \
+                self.assertLogs("core.slow_queries", "WARNING") as logs:
+            self.client.get(utils.RECIPES_URL)
+
+        output = "\n".join(logs.output)
+        self.assertIn("in recipe:recipe-list", output)
+        self.assertIn('FROM "core_recipe"', output)
+        self.assertIn("Plan:", output)
+        self.assertNotIn("EXPLAIN failed", output)
+
+    def test_streamed_query_logged(self):
+        """Test that queries run while streaming a response are logged"""
+        utils.create_recipe(self.user)
+
+        with patch.object(slow_queries, "slow_query_log", self.log), \
+                self.assertLogs("core.slow_queries", "WARNING") as logs:
+            res = self.client.get(utils.RECIPES_EXPORT_URL)
+            b"".join(res.streaming_content)
+
+        output = "\n".join(logs.output)
+        self.assertIn("in recipe:recipe-export", output)
+        self.assertIn('FROM "core_recipe"', output)
+
+    def test_statement_cooldown(self):
+        """Test that the same statement is logged once per cooldown"""
+        with patch.object(self.log, "write") as write:
+            for _ in range(3):
+                self.log.record("default", "SELECT 1", (), 1, "view")
+
+        self.assertEqual(write.call_count, 1)
+
+    def test_fast_query_not_logged(self):
+        """Test that queries under the threshold are not logged"""
+        self.log.threshold = 60
+
+        with patch.object(slow_queries, "slow_query_log", self.log), \
+                patch.object(self.log, "record") as record:
+            self.client.get(utils.RECIPES_URL)
+
+        record.assert_not_called()
@@ -0,0 +1,30 @@
+from django.test import SimpleTestCase
+
+from core import startup
+
+
+# Generous budget so only a real regression fails, not a slow machine
+SETUP_BUDGET = 3
+
+
+class StartupTests(SimpleTestCase):
+    """Test the start up time of a fresh process"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.profile = startup.run("/api/recipe/recipes/")
+
+    def test_heavy_modules_not_imported_at_setup(self):
+        """Test that Pillow and admin registrations load lazily"""
+        for module in ("PIL", "core.admin", "recipe.views"):
+            self.assertNotIn(module, self.profile["setup_modules"])
+
+    def test_pillow_not_imported_by_first_request(self):
+        """Test that serving recipes does not import Pillow"""
+        self.assertNotIn("PIL", self.profile["modules"])
+        self.assertIn("recipe.views", self.profile["modules"])
+
+    def test_setup_time(self):
+        """Test that Django sets up within the import time budget"""
+        self.assertLess(self.profile["setup"], SETUP_BUDGET)
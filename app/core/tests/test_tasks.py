@@ -0,0 +1,135 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core import tasks
+from core.models import Task
+
+
+calls = []
+
+
+@tasks.task("tests.record")
+def record(value, twice=False):
+    calls.append(value)
+    if twice:
+        calls.append(value)
+
+
+@tasks.task("tests.fail")
+def fail():
+    raise RuntimeError("broken")
+
+
+class TaskQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_claim_skips_running_tasks(self):
+        """Test a task is only claimed by one worker"""
+        task = tasks.enqueue("tests.record", 1)
+
+        self.assertEqual(tasks.claim("worker-1").id, task.id)
+        self.assertIsNone(tasks.claim("worker-2"))
+
+    @override_settings(TASK_RETRY_BACKOFF=10)
+    def test_failed_task_retried_with_backoff(self):
+        """Test a failing task is retried later, then marked failed"""
+        task = tasks.enqueue("tests.fail", max_attempts=2)
+
+        tasks.run(tasks.claim("worker"))
+        task.refresh_from_db()
+
+        self.assertEqual(task.status, Task.QUEUED)
+        self.assertIn("broken", task.last_error)
+        self.assertGreater(task.run_at, task.created)
+        self.assertIsNone(tasks.claim("worker"))
+
+        Task.objects.filter(id=task.id).update(run_at=task.created)
+        tasks.run(tasks.claim("worker"))
+        task.refresh_from_db()
+
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(task.attempts, 2)
+
+    @override_settings(TASK_LOCK_TIMEOUT=-1)
+    def test_stale_running_task_requeued(self):
+        """Test a task left running by a stopped worker is queued again"""
+        task = tasks.enqueue("tests.record", 1)
+        tasks.claim("worker")
+
+        self.assertEqual(tasks.requeue_stale(), 1)
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.QUEUED)
+
+    @override_settings(TASK_RETENTION=-1)
+    def test_finished_tasks_deleted(self):
+        """Test finished tasks are deleted after the retention period"""
+        done = tasks.enqueue("tests.record", 1)
+        failed = tasks.enqueue("tests.fail", max_attempts=1)
+        queued = tasks.enqueue("tests.record", 2, delay=60)
+        tasks.run(tasks.claim("worker"))
+        tasks.run(tasks.claim("worker"))
+
+        self.assertEqual(tasks.delete_finished(batch_size=1), 2)
+        self.assertFalse(
+            Task.objects.filter(id__in=[done.id, failed.id]).exists()
+        )
+        self.assertTrue(Task.objects.filter(id=queued.id).exists())
+
+    def test_recent_finished_tasks_kept(self):
+        """Test tasks finished within the retention period are kept"""
+        tasks.enqueue("tests.record", 1)
+        tasks.run(tasks.claim("worker"))
+
+        self.assertEqual(tasks.delete_finished(), 0)
+        self.assertEqual(Task.objects.count(), 1)
+
+    @patch("core.tasks.connection")
+    def test_claim_without_skip_locked(self, mock_connection):
+        """Test claiming falls back to a conditional update"""
+        mock_connection.features.has_select_for_update_skip_locked = False
+        task = tasks.enqueue("tests.record", 1)
+
+        self.assertEqual(tasks.claim("worker").status, Task.RUNNING)
+        self.assertIsNone(tasks.claim("worker"))
+        task.refresh_from_db()
+        self.assertEqual(task.locked_by, "worker")
+
+
+class RunWorkerTests(TransactionTestCase):
+    """Test the run_worker command, which closes its database connections"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_run_worker_runs_due_tasks(self):
+        """Test the worker runs the queued tasks and marks them done"""
+        task = tasks.enqueue("tests.record", 1, twice=True)
+        tasks.enqueue("tests.record", 2, delay=60)
+
+        call_command(
+            "run_worker", burst=True, concurrency=1, stdout=StringIO()
+        )
+
+        task.refresh_from_db()
+        self.assertEqual(calls, [1, 1])
+        self.assertEqual(task.status, Task.DONE)
+        self.assertEqual(Task.objects.filter(status=Task.QUEUED).count(), 1)
+
+    @override_settings(TASK_LOCK_TIMEOUT=-1, TASK_SWEEP_INTERVAL=0)
+    def test_run_worker_requeues_stale_tasks(self):
+        """Test the worker picks up the tasks of a stopped worker"""
+        task = tasks.enqueue("tests.record", 1)
+        tasks.claim("stopped-worker")
+
+        call_command(
+            "run_worker", burst=True, concurrency=1, stdout=StringIO()
+        )
+
+        task.refresh_from_db()
+        self.assertEqual(calls, [1])
+        self.assertEqual(task.status, Task.DONE)
@@ -0,0 +1,198 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, \
+                        HttpResponseForbidden
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, \
+                               patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date, parse_http_date_safe
+
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+
+from core import metrics
+from core.authentication import CachedTokenAuthentication
+from core.models import Recipe
+from core.storage import is_content_addressed
+
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+VARIANT_SUFFIX = re.compile(r"_\d+(?=\.\w+$)")
+
+
+class RangeFile:
+    """Read only a byte range of a file"""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    """Serve files whatever the client accepts"""
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return (renderers[0], renderers[0].media_type)
+
+
+def parse_range(header, size):
+    """Return the (start, end) of a single byte range, or None to ignore
+
+    Raises ValueError when the range cannot be satisfied.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+
+    start, end = match.groups()
+    if start == "":
+        length = int(end)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+
+    return start, end
+
+
+class MediaView(APIView):
+    """Serve the authenticated user's recipe images
+
+    Supports conditional requests and single byte ranges, and hands the
+    transfer to a front proxy with X-Accel-Redirect or X-Sendfile when
+    MEDIA_ACCEL is set.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    content_negotiation_class = IgnoreClientContentNegotiation
+
+    def check_access(self, request, path):
+        """Raise 404 unless the file is an image of the user's recipes"""
+        name = VARIANT_SUFFIX.sub("", path)
+        if not Recipe.objects.filter(user=request.user, image=name).exists():
+            raise Http404()
+
+    def get(self, request, path):
+        path = os.path.normpath(path).lstrip("/")
+        self.check_access(request, path)
+
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        try:
+            stat = os.stat(full_path)
+        except FileNotFoundError:
+            raise Http404()
+
+        content_type = mimetypes.guess_type(full_path)[0] or \
+            "application/octet-stream"
+        etag = f'"{int(stat.st_mtime)}-{stat.st_size}"'
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(stat.st_mtime)
+        )
+        if response is None:
+            response = self.file_response(
+                request, path, full_path, stat, content_type, etag
+            )
+
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(stat.st_mtime)
+        response["Accept-Ranges"] = "bytes"
+        if is_content_addressed(path):
+            patch_cache_control(
+                response,
+                private=True,
+                max_age=IMMUTABLE_MAX_AGE,
+                immutable=True,
+            )
+
+        return response
+
+    def file_response(self, request, path, full_path, stat, content_type,
+                      etag):
+        """Return the file, a byte range of it or a proxy redirect"""
+        accel = settings.MEDIA_ACCEL
+        if accel == "x-accel-redirect":
+            response = HttpResponse(content_type=content_type)
+            response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + path
+            return response
+        if accel == "x-sendfile":
+            response = HttpResponse(content_type=content_type)
+            response["X-Sendfile"] = full_path
+            return response
+
+        byte_range = None
+        range_header = request.META.get("HTTP_RANGE")
+        if range_header and self.if_range_passes(request, etag, stat):
+            try:
+                byte_range = parse_range(range_header, stat.st_size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{stat.st_size}"
+                return response
+
+        if byte_range is None:
+            return FileResponse(
+                open(full_path, "rb"), content_type=content_type
+            )
+
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(
+            RangeFile(open(full_path, "rb"), start, length),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Length"] = str(length)
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+
+        return response
+
+    def if_range_passes(self, request, etag, stat):
+        """Return whether a Range applies given the If-Range validator"""
+        if_range = request.META.get("HTTP_IF_RANGE")
+        if not if_range:
+            return True
+        if if_range.startswith('"'):
+            return if_range == etag
+
+        modified = parse_http_date_safe(if_range)
+        return modified is not None and int(stat.st_mtime) <= modified
+
+
+def metrics_view(request):
+    """Serve the metrics in the Prometheus text format"""
+    token = settings.METRICS["TOKEN"]
+    if token and not constant_time_compare(
+        request.META.get("HTTP_AUTHORIZATION", ""), f"Bearer {token}"
+    ):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        metrics.registry.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
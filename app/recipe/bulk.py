@@ -0,0 +1,127 @@
+import re
+from collections import Counter
+
+from django.db import connection
+
+from core import stats
+from core.cache import bump_user_version
+from core.models import Tag, Ingredient, Recipe
+from core.search import index_recipes
+
+
+BATCH_SIZE = 500
+RELATED_MODELS = (("tags", Tag), ("ingredients", Ingredient))
+
+
+def parse_pk(value):
+    """Return an integer primary key, or None if value is not one"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and re.fullmatch(r"[0-9]+", value):
+        return int(value)
+
+    return None
+
+
+def resolve_related_objects(user, items):
+    """Return the user's tags and ingredients referenced by the items"""
+    related_objects = {}
+    for field_name, model in RELATED_MODELS:
+        pks = set()
+        for item in items:
+            values = item.get(field_name) if isinstance(item, dict) else None
+            if isinstance(values, list):
+                pks.update(parse_pk(value) for value in values)
+        pks.discard(None)
+
+        related_objects[field_name] = model.objects.filter(
+            user=user
+        ).in_bulk(pks)
+
+    return related_objects
+
+
+def _split_related(validated_data):
+    """Split validated data into model fields and related objects"""
+    fields = dict(validated_data)
+    related = {
+        field_name: fields.pop(field_name)
+        for field_name, _ in RELATED_MODELS
+        if field_name in fields
+    }
+
+    return fields, related
+
+
+def _replace_related(user, recipes_related, created=False):
+    """Replace the tags and ingredients of recipes with bulk queries"""
+    counts = Counter()
+    for field_name, _ in RELATED_MODELS:
+        through = getattr(Recipe, field_name).through
+        target_column = getattr(Recipe, field_name).field.m2m_reverse_name()
+        dimension = stats.dimension_of(through)[1]
+        changed = [
+            (recipe, related[field_name])
+            for recipe, related in recipes_related
+            if field_name in related
+        ]
+        if not changed:
+            continue
+
+        recipe_ids = [recipe.id for recipe, _ in changed]
+        if not created:
+            counts.subtract(stats.related_counts(recipe_ids, field_name))
+            through.objects.filter(recipe_id__in=recipe_ids).delete()
+        through.objects.bulk_create(
+            [
+                through(recipe_id=recipe.id, **{target_column: obj.id})
+                for recipe, objects in changed
+                for obj in objects
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        counts.update(
+            (dimension, obj.id) for _, objects in changed for obj in objects
+        )
+
+    stats.apply(user.id, counts=counts)
+
+
+def bulk_create_recipes(user, validated_items):
+    """Create recipes and their tags and ingredients in bulk"""
+    recipes, recipes_related = [], []
+    for validated_data in validated_items:
+        fields, related = _split_related(validated_data)
+        recipe = Recipe(user=user, **fields)
+        recipes.append(recipe)
+        recipes_related.append((recipe, related))
+
+    if connection.features.can_return_ids_from_bulk_insert:
+        Recipe.objects.bulk_create(recipes, batch_size=BATCH_SIZE)
+        index_recipes(recipes, created=True)
+        stats.apply(user.id, **stats.recipe_counts(recipes))
+    else:
+        for recipe in recipes:
+            recipe.save()
+
+    _replace_related(user, recipes_related, created=True)
+    bump_user_version(user.id)
+
+    return recipes
+
+
+def bulk_update_recipes(user, instances_items):
+    """Update recipes and replace their tags and ingredients in bulk"""
+    recipes_related = []
+    for recipe, validated_data in instances_items:
+        fields, related = _split_related(validated_data)
+        for attr, value in fields.items():
+            setattr(recipe, attr, value)
+        if fields:
+            recipe.save(update_fields=list(fields))
+        recipes_related.append((recipe, related))
+
+    _replace_related(user, recipes_related)
+    bump_user_version(user.id)
+
+    return [recipe for recipe, _ in instances_items]
@@ -0,0 +1,56 @@
+import csv
+import json
+from itertools import islice
+
+from django.db.models import prefetch_related_objects
+
+
+FIELDS = ("id", "title", "time_minutes", "price", "link", "tags",
+          "ingredients")
+
+
+class Echo:
+    """File-like object returning what is written to it"""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size):
+    """Yield recipes as dicts, prefetching tags and ingredients per chunk"""
+    recipes = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(recipes, chunk_size))
+        if not chunk:
+            return
+
+        prefetch_related_objects(chunk, "tags", "ingredients")
+        for recipe in chunk:
+            yield {
+                "id": recipe.id,
+                "title": recipe.title,
+                "time_minutes": recipe.time_minutes,
+                "price": str(recipe.price),
+                "link": recipe.link,
+                "tags": [tag.name for tag in recipe.tags.all()],
+                "ingredients": [
+                    ingredient.name for ingredient in recipe.ingredients.all()
+                ],
+            }
+
+
+def ndjson_lines(rows):
+    """Yield rows as newline delimited JSON"""
+    for row in rows:
+        yield json.dumps(row) + "\n"
+
+
+def csv_lines(rows, separator="|"):
+    """Yield rows as CSV, joining tags and ingredients with the separator"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+
+    for row in rows:
+        row["tags"] = separator.join(row["tags"])
+        row["ingredients"] = separator.join(row["ingredients"])
+        yield writer.writerow([row[field] for field in FIELDS])
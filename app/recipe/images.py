@@ -0,0 +1,62 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from core.cache import bump_user_version
+from core.models import Recipe
+from core.storage import variant_name
+from core.tasks import enqueue
+
+
+def variant_urls(recipe, request=None):
+    """Return the URLs of the ready image variants of a recipe by size"""
+    if not recipe.image or not recipe.image_variants:
+        return {}
+
+    urls = {}
+    for size in recipe.image_variants.split(","):
+        url = default_storage.url(variant_name(recipe.image.name, size))
+        urls[size] = request.build_absolute_uri(url) if request else url
+
+    return urls
+
+
+def generate_variants(recipe_id, name):
+    """Store resized variants of a recipe image and mark them ready"""
+    from PIL import Image
+
+    if not Recipe.objects.filter(id=recipe_id, image=name).exists():
+        return
+
+    with default_storage.open(name) as image_file:
+        image = Image.open(image_file)
+        image.load()
+
+    image_format = image.format
+    sizes = []
+    for size in settings.RECIPE_IMAGE_VARIANT_SIZES:
+        variant = image.copy()
+        variant.thumbnail((size, size))
+        content = BytesIO()
+        variant.save(content, format=image_format)
+
+        path = variant_name(name, size)
+        if not default_storage.exists(path):
+            default_storage.save(path, ContentFile(content.getvalue()))
+        sizes.append(str(size))
+
+    updated = Recipe.objects.filter(id=recipe_id, image=name).update(
+        image_variants=",".join(sizes)
+    )
+    if updated:
+        user_id = Recipe.objects.values_list(
+            "user_id", flat=True
+        ).get(id=recipe_id)
+        bump_user_version(user_id)
+
+
+def enqueue_variants(recipe):
+    """Queue the generation of the image variants of a recipe"""
+    enqueue("recipe.generate_image_variants", recipe.id, recipe.image.name)
@@ -0,0 +1,123 @@
+import csv
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.bulk import BATCH_SIZE, bulk_create_recipes
+
+
+FIELDS = ("title", "time_minutes", "price", "link")
+RELATED_MODELS = (("tags", Tag), ("ingredients", Ingredient))
+
+
+def read_rows(file, file_format, separator="|"):
+    """Yield (line number, row) pairs from a JSON lines or CSV file"""
+    if file_format == "csv":
+        reader = csv.DictReader(file)
+        for row in reader:
+            for field_name, _ in RELATED_MODELS:
+                value = row.get(field_name) or ""
+                row[field_name] = value.split(separator) if value else []
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(file, 1):
+        if line.strip():
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as error:
+                yield line_number, error
+
+
+def parse_row(row):
+    """Return the cleaned fields and related names of a row
+
+    Raises ValidationError when the row is not a valid recipe.
+    """
+    if isinstance(row, ValueError):
+        raise ValidationError(f"Invalid JSON: {row}")
+    if not isinstance(row, dict):
+        raise ValidationError("Expected an object.")
+
+    fields = {}
+    for field_name in FIELDS:
+        field = Recipe._meta.get_field(field_name)
+        value = row.get(field_name)
+        if value is None and field.blank:
+            value = ""
+        try:
+            fields[field_name] = field.clean(value, None)
+        except ValidationError as error:
+            raise ValidationError(f"{field_name}: {' '.join(error.messages)}")
+
+    names = {}
+    for field_name, model in RELATED_MODELS:
+        values = row.get(field_name) or []
+        if not isinstance(values, list):
+            raise ValidationError(f"{field_name}: Expected a list of names.")
+        field = model._meta.get_field("name")
+        try:
+            names[field_name] = list(dict.fromkeys(
+                field.clean(str(value).strip(), None)
+                for value in values if str(value).strip()
+            ))
+        except ValidationError as error:
+            raise ValidationError(f"{field_name}: {' '.join(error.messages)}")
+
+    return fields, names
+
+
+class RecipeImporter:
+    """Create a user's recipes in chunks, resolving related objects by name
+
+    Tags and ingredients are looked up once per name and created in bulk
+    when they are missing, so a chunk costs a fixed number of queries.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.related_objects = {
+            field_name: {} for field_name, _ in RELATED_MODELS
+        }
+
+    def resolve(self, field_name, model, names):
+        """Return the user's objects for names, creating missing ones"""
+        known = self.related_objects[field_name]
+        unknown = [name for name in names if name not in known]
+        if not unknown:
+            return known
+
+        self.fetch(model, known, unknown)
+        missing = [name for name in unknown if name not in known]
+        created = model.objects.bulk_create(
+            [model(user=self.user, name=name) for name in missing],
+            batch_size=BATCH_SIZE,
+        )
+        if connection.features.can_return_ids_from_bulk_insert:
+            known.update((obj.name, obj) for obj in created)
+        else:
+            self.fetch(model, known, missing)
+
+        return known
+
+    def fetch(self, model, known, names):
+        """Add the user's existing objects with the names to known"""
+        for start in range(0, len(names), BATCH_SIZE):
+            for obj in model.objects.filter(
+                user=self.user, name__in=names[start:start + BATCH_SIZE]
+            ):
+                known.setdefault(obj.name, obj)
+
+    def import_chunk(self, parsed_rows):
+        """Create recipes with their tags and ingredients from parsed rows"""
+        items = [dict(fields) for fields, _ in parsed_rows]
+        for field_name, model in RELATED_MODELS:
+            known = self.resolve(field_name, model, {
+                name for _, names in parsed_rows for name in names[field_name]
+            })
+            for item, (_, names) in zip(items, parsed_rows):
+                item[field_name] = [known[name] for name in names[field_name]]
+
+        return bulk_create_recipes(self.user, items)
@@ -0,0 +1,85 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from rest_framework.response import Response
+
+from core.cache import get_user_version, get_user_last_modified, \
+                       user_cache_key, get_user_cache, set_user_cache
+
+
+class CachedListMixin:
+    """Cache list responses until the user's recipe data changes"""
+
+    def list(self, request, *args, **kwargs):
+        key = user_cache_key(
+            request.user.id,
+            self.queryset.model._meta.label_lower,
+            request.query_params
+        )
+        data = get_user_cache(key)
+
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            set_user_cache(key, data)
+
+        return Response(data)
+
+
+class ConditionalGetMixin:
+    """Answer conditional list and detail requests from the data version
+
+    The ETag is derived from the user's data version, so a matching
+    If-None-Match or If-Modified-Since is answered with 304 Not Modified
+    before the queryset is evaluated or the serializer runs. The version
+    is kept in the shared user cache and changes when writes commit, so
+    every process derives the same ETag for the same data.
+    """
+
+    def get_etag(self, request):
+        """Return the ETag of the response for the user's data version"""
+        version = get_user_version(request.user.id)
+        digest = hashlib.md5(
+            f"{version}:{request.accepted_media_type}:"
+            f"{request.get_full_path()}".encode()
+        ).hexdigest()
+
+        return f'"{digest}"'
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        """Return 304 when the client is up to date, else call handler"""
+        etag = self.get_etag(request)
+        last_modified = get_user_last_modified(request.user.id)
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+        patch_vary_headers(response, ("Authorization",))
+
+        return response
+
+
+class ConditionalListMixin(ConditionalGetMixin):
+    """Answer conditional list requests"""
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+
+class ConditionalRetrieveMixin(ConditionalGetMixin):
+    """Answer conditional detail requests"""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
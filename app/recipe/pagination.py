@@ -0,0 +1,148 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor
+
+
+class KeysetCursorPagination(CursorPagination):
+    """Cursor pagination positioned on every field of the ordering
+
+    DRF positions cursors on the first ordering field only and skips the
+    rows sharing its value by offset, which returns wrong pages once more
+    rows than ``offset_cutoff`` tie. The ordering must end with a unique
+    field, so encoding the values of all its fields makes every page a
+    keyset lookup without offsets.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self._decode_position(self.cursor)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                field[1:] if field.startswith("-") else f"-{field}"
+                for field in ordering
+            )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = position is not None
+
+        if (self.has_previous or self.has_next) and \
+                self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def _decode_position(self, cursor):
+        """Return the field values a cursor is positioned after, or None"""
+        if cursor is None or cursor.position is None:
+            return None
+
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or \
+                len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position
+
+    def _after(self, ordering, position):
+        """Return a filter for the rows following a position"""
+        condition = None
+        for field, value in reversed(list(zip(ordering, position))):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            following = Q(**{f"{name}__{lookup}": value})
+            condition = following if condition is None else \
+                following | Q(**{name: value}) & condition
+
+        # Bound the leading field as well, so its index is range scanned
+        name = ordering[0].lstrip("-")
+        lookup = "lte" if ordering[0].startswith("-") else "gte"
+
+        return Q(**{f"{name}__{lookup}": position[0]}) & condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        return json.dumps(
+            [getattr(instance, field.lstrip("-")) for field in ordering],
+            cls=DjangoJSONEncoder,
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        # Without rows on a reversed page the next page is the first one
+        position = self._get_position_from_instance(
+            self.page[-1], self.ordering
+        ) if self.page else None
+
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=position)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+
+        # Without rows after the position the previous page is the last one
+        position = self._get_position_from_instance(
+            self.page[0], self.ordering
+        ) if self.page else None
+
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=position)
+        )
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Paginate recipes newest first using an opaque cursor"""
+    ordering = "-id"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class RecipeSearchCursorPagination(KeysetCursorPagination):
+    """Paginate recipe search results best match first"""
+    ordering = ("-search_rank", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class RecipeAttrCursorPagination(CursorPagination):
+    """Paginate tags and ingredients by name using an opaque cursor"""
+    ordering = ("-name", "id")
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class RecipeAttrCountCursorPagination(KeysetCursorPagination):
+    """Paginate tags and ingredients most used first"""
+    ordering = ("-recipe_count", "id")
+    page_size_query_param = "page_size"
+    max_page_size = 1000
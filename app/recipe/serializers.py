@@ -1,15 +1,88 @@
+from django.utils.translation import ugettext_lazy as _
+
 from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, MANY_RELATION_KWARGS
 
 from core.models import Tag, Ingredient, Recipe
 
+from recipe.bulk import parse_pk
+from recipe.images import variant_urls
+from recipe.uploads import BoundedImageField
+
+
+class UserOwnedManyRelatedField(ManyRelatedField):
+    """Resolve a list of primary keys in a single query
+
+    Objects already resolved by the caller can be passed in the serializer
+    context as ``related_objects``, keyed by field name and primary key.
+    """
+    default_error_messages = {
+        "does_not_exist": _(
+            'Invalid pks "{pk_values}" - objects do not exist.'
+        ),
+    }
+
+    def to_internal_value(self, data):
+        """Return the objects for all submitted primary keys at once"""
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+
+        pks = []
+        for value in data:
+            pk = parse_pk(value)
+            if pk is None:
+                self.child_relation.fail("does_not_exist", pk_value=value)
+            pks.append(pk)
+        pks = list(dict.fromkeys(pks))
+
+        related_objects = self.context.get("related_objects", {})
+        if self.field_name in related_objects:
+            objects = related_objects[self.field_name]
+        else:
+            objects = self.child_relation.get_queryset().in_bulk(pks)
+        missing = [pk for pk in pks if pk not in objects]
+        if missing:
+            self.fail(
+                "does_not_exist",
+                pk_values=", ".join(str(pk) for pk in missing)
+            )
+
+        return [objects[pk] for pk in pks]
+
+
+class UserOwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field limited to objects owned by the request user"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        """Use a many field that validates all primary keys in one query"""
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+
+        return UserOwnedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        """Return only the objects owned by the authenticated user"""
+        queryset = super().get_queryset()
+        request = self.context.get("request")
+
+        if request is None:
+            return queryset.none()
+
+        return queryset.filter(user=request.user)
+
 
 class TagSerializer(serializers.ModelSerializer):
     """Serializer for tag objects"""
 
     class Meta:
         model = Tag
-        fields = ("id", "name")
-        read_only_fields = ("id",)
+        fields = ("id", "name", "recipe_count")
+        read_only_fields = ("id", "recipe_count")
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -17,30 +90,49 @@ class IngredientSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Ingredient
-        fields = ("id", "name")
-        read_only_fields = ("id",)
+        fields = ("id", "name", "recipe_count")
+        read_only_fields = ("id", "recipe_count")
 
 
 class RecipeSerializer(serializers.ModelSerializer):
     """Serialize a recipe object"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserOwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
 
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserOwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
 
+    image_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Recipe
         fields = (
             "id", "title", "ingredients", "tags", "time_minutes", "price",
-            "link"
+            "link", "image_variants"
         )
         read_only_fields = ("id",)
 
+    def get_image_variants(self, obj):
+        """Return the URLs of the ready resized images by size"""
+        return variant_urls(obj, self.context.get("request"))
+
+    def create(self, validated_data):
+        """Create a recipe and add its already resolved tags and ingredients"""
+        tags = validated_data.pop("tags", [])
+        ingredients = validated_data.pop("ingredients", [])
+        recipe = Recipe.objects.create(**validated_data)
+
+        if tags:
+            recipe.tags.add(*tags)
+        if ingredients:
+            recipe.ingredients.add(*ingredients)
+
+        return recipe
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serialize a recipe detail"""
@@ -50,8 +142,18 @@ class RecipeDetailSerializer(RecipeSerializer):
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
+    image = BoundedImageField(
+        allow_null=True,
+        required=False,
+        max_length=100
+    )
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ("id", "image")
+        fields = ("id", "image", "image_variants")
         read_only_fields = ("id",)
+
+    def get_image_variants(self, obj):
+        """Return the URLs of the ready resized images by size"""
+        return variant_urls(obj, self.context.get("request"))
@@ -0,0 +1,9 @@
+from core.tasks import task
+
+from recipe import images
+
+
+@task("recipe.generate_image_variants")
+def generate_image_variants(recipe_id, name):
+    """Store the resized variants of a recipe image"""
+    images.generate_variants(recipe_id, name)
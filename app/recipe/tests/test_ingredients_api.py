@@ -41,7 +41,7 @@ class PrivateIngredientsApiTests(TestCase):
 
         serializer = IngredientSerializer(utils.all_ingredients(), many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """Test that ingredients for the authenticated user are returned"""
@@ -51,8 +51,8 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(utils.INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["name"], ingredient.name)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["name"], ingredient.name)
 
     def test_create_ingredients_success(self):
         """Test create a new ingredient"""
@@ -82,11 +82,12 @@ class PrivateIngredientsApiTests(TestCase):
 
         res = self.client.get(utils.INGREDIENTS_URL, {"assigned_only": 1})
 
+        ingredient1.refresh_from_db()
         serializer1 = IngredientSerializer(ingredient1)
         serializer2 = IngredientSerializer(ingredient2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertNotIn(serializer2.data, res.data["results"])
 
     def test_retrieve_ingredients_assigned_unique(self):
         """Test filtering ingredients by assigned returns unique items"""
@@ -101,4 +102,19 @@ class PrivateIngredientsApiTests(TestCase):
 
         res = self.client.get(utils.INGREDIENTS_URL, {"assigned_only": 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_ingredient_recipe_count_maintained(self):
+        """Test the recipe count of an ingredient follows its recipes"""
+        ingredient = utils.create_ingredent(self.user, "Appels")
+        recipe = utils.create_recipe(self.user, **utils.RECIPE_PAYLOAD)
+        recipe.ingredients.add(ingredient)
+
+        res = self.client.get(utils.INGREDIENTS_URL)
+
+        self.assertEqual(res.data["results"][0]["recipe_count"], 1)
+
+        recipe.ingredients.clear()
+        res = self.client.get(utils.INGREDIENTS_URL, {"assigned_only": 1})
+
+        self.assertEqual(len(res.data["results"]), 0)
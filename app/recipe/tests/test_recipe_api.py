@@ -1,17 +1,23 @@
 from copy import deepcopy
+import json
+from unittest.mock import patch
 
+import struct
 import tempfile
+import tracemalloc
 import os
+import zlib
 
 from PIL import Image
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe
 
+from recipe import images
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 import app.utils as utils
@@ -48,7 +54,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(utils.all_recipes(), many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Test retrieving recipes for user"""
@@ -61,8 +67,101 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"], serializer.data)
+
+    def test_recipes_paginated_by_cursor(self):
+        """Test paging through recipes with the next cursor"""
+        recipes = [utils.create_recipe(self.user) for _ in range(3)]
+
+        res = self.client.get(utils.RECIPES_URL, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe["id"] for recipe in res.data["results"]],
+            [recipes[2].id, recipes[1].id]
+        )
+        self.assertIsNone(res.data["previous"])
+
+        res = self.client.get(res.data["next"])
+
+        self.assertEqual(
+            [recipe["id"] for recipe in res.data["results"]],
+            [recipes[0].id]
+        )
+        self.assertIsNone(res.data["next"])
+        self.assertIsNotNone(res.data["previous"])
+
+    def test_search_recipes_by_title(self):
+        """Test searching recipes ranks full word matches first"""
+        recipe1 = utils.create_recipe(self.user, title="Chocolate cake")
+        recipe2 = utils.create_recipe(self.user, title="Choco chip cookies")
+        utils.create_recipe(self.user, title="Carrot soup")
+        utils.create_recipe(self.user2, title="Chocolate mousse")
+
+        res = self.client.get(utils.RECIPES_URL, {"search": "choco"})
+
+        self.assertEqual(
+            [recipe["id"] for recipe in res.data["results"]],
+            [recipe2.id, recipe1.id]
+        )
+
+    def test_search_recipes_after_title_change(self):
+        """Test the search index follows recipe title changes"""
+        recipe = utils.create_recipe(self.user, title="Carrot soup")
+        recipe.title = "Pumpkin soup"
+        recipe.save()
+
+        res = self.client.get(utils.RECIPES_URL, {"search": "carrot"})
+        self.assertEqual(len(res.data["results"]), 0)
+
+        res = self.client.get(utils.RECIPES_URL, {"search": "pump soup"})
+        self.assertEqual(
+            [recipe["id"] for recipe in res.data["results"]],
+            [recipe.id]
+        )
+
+    def test_search_recipes_paginated(self):
+        """Test search results are paginated by rank"""
+        recipes = [
+            utils.create_recipe(self.user, title="Tomato soup")
+            for _ in range(3)
+        ]
+
+        res = self.client.get(
+            utils.RECIPES_URL, {"search": "soup", "page_size": 2}
+        )
+        ids = [recipe["id"] for recipe in res.data["results"]]
+        res = self.client.get(res.data["next"])
+        ids += [recipe["id"] for recipe in res.data["results"]]
+
+        self.assertEqual(ids, [recipe.id for recipe in reversed(recipes)])
+
+    @patch("recipe.pagination.RecipeSearchCursorPagination.offset_cutoff", 1)
+    def test_search_recipes_paginated_with_tied_ranks(self):
+        """Test paging through equally ranked results visits each once"""
+        recipes = [
+            utils.create_recipe(self.user, title="Tomato soup")
+            for _ in range(5)
+        ]
+        expected = [recipe.id for recipe in reversed(recipes)]
+
+        ids, url = [], utils.RECIPES_URL
+        params = {"search": "soup", "page_size": 2}
+        for _ in range(len(recipes)):
+            res = self.client.get(url, params)
+            ids += [recipe["id"] for recipe in res.data["results"]]
+            url, params = res.data["next"], None
+            if url is None:
+                break
+
+        self.assertEqual(ids, expected)
+
+        res = self.client.get(res.data["previous"])
+
+        self.assertEqual(
+            [recipe["id"] for recipe in res.data["results"]], expected[2:4]
+        )
 
     def test_view_recipe_detail(self):
         """Test viewing a recipe detial"""
@@ -76,6 +175,32 @@ class PrivateRecipeApiTests(TestCase):
 
         self.assertEqual(res.data, serializer.data)
 
+    def test_recipe_detail_not_modified(self):
+        """Test a detail request with a current ETag returns 304"""
+        recipe = utils.create_recipe(self.user)
+        url = utils.recipe_detail_url(recipe.id)
+        res = self.client.get(url)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=res["ETag"])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_recipe_list_modified_after_write(self):
+        """Test the list ETag changes when a recipe changes"""
+        recipe = utils.create_recipe(self.user)
+        res = self.client.get(utils.RECIPES_URL)
+        etag = res["ETag"]
+        self.assertIn("Last-Modified", res)
+
+        recipe.title = "Changed"
+        recipe.save()
+        res = self.client.get(utils.RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+        self.assertEqual(res.data["results"][0]["title"], "Changed")
+
     def test_create_basic_recipe(self):
         """Test creating recipe"""
         res = self.client.post(utils.RECIPES_URL, utils.RECIPE_PAYLOAD)
@@ -120,6 +245,51 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_with_tags_query_count(self):
+        """Test submitted tags are validated in a single query"""
+        tag_ids = [
+            utils.create_tag(self.user, f"Tag {i}").id for i in range(10)
+        ]
+        payload = deepcopy(utils.RECIPE_PAYLOAD)
+        payload.update({"tags": tag_ids})
+
+        # Statistics cost a fixed 6 queries: totals, the price range count
+        # looked up and created, and one update of the tags' recipe counts
+        with self.assertNumQueries(13):
+            res = self.client.post(utils.RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data["id"])
+        self.assertEqual(recipe.tags.count(), 10)
+
+    def test_create_recipe_with_other_users_tag(self):
+        """Test creating a recipe with another user's tag fails"""
+        tag = utils.create_tag(self.user, "Vegan")
+        tag2 = utils.create_tag(self.user2, "Dessert")
+        payload = deepcopy(utils.RECIPE_PAYLOAD)
+        payload.update({"tags": [tag.id, tag2.id, 999999]})
+        res = self.client.post(utils.RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(tag2.id), res.data["tags"][0])
+        self.assertIn("999999", res.data["tags"][0])
+        self.assertNotIn(f"{tag.id},", res.data["tags"][0])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_recipe_with_non_integer_tag(self):
+        """Test tag IDs that are not integers are rejected, not truncated"""
+        tag = utils.create_tag(self.user, "Vegan")
+
+        for value in (tag.id + 0.9, True, f"{tag.id}.0", None):
+            payload = deepcopy(utils.RECIPE_PAYLOAD)
+            payload.update({"tags": [value]})
+            res = self.client.post(utils.RECIPES_URL, payload, format="json")
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("Invalid pk", res.data["tags"][0])
+
+        self.assertFalse(Recipe.objects.exists())
+
     def test_partial_update_recipe(self):
         """Test updating a recipe with patch"""
         recipe = utils.create_recipe(self.user)
@@ -158,6 +328,202 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(len(tags), 0)
 
 
+class RecipeBulkApiTests(TestCase):
+    """Test the bulk recipe API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = utils.create_user(**utils.USER_PAYLOAD)
+        self.user2 = utils.create_user(**utils.USER_PAYLOAD_UPDATE)
+        self.client.force_authenticate(self.user)
+        self.tag = utils.create_tag(self.user, "Vegan")
+        self.ingredient = utils.create_ingredent(self.user, "Salt")
+
+    def test_bulk_create_recipes(self):
+        """Test creating many recipes with per item results"""
+        payload = [
+            {
+                "title": f"Recipe {i}",
+                "time_minutes": 10,
+                "price": "5.00",
+                "tags": [self.tag.id],
+                "ingredients": [self.ingredient.id],
+            }
+            for i in range(3)
+        ]
+        payload.append({"title": "Missing fields"})
+
+        res = self.client.post(utils.RECIPES_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result["status"] for result in res.data],
+            [status.HTTP_201_CREATED] * 3 + [status.HTTP_400_BAD_REQUEST]
+        )
+        self.assertIn("time_minutes", res.data[3]["errors"])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+        for result in res.data[:3]:
+            recipe = Recipe.objects.get(id=result["data"]["id"])
+            self.assertEqual(list(recipe.tags.all()), [self.tag])
+            self.assertEqual(
+                list(recipe.ingredients.all()),
+                [self.ingredient]
+            )
+
+    def test_bulk_create_recipes_other_users_tag(self):
+        """Test bulk creating a recipe with another user's tag fails"""
+        tag = utils.create_tag(self.user2, "Dessert")
+        payload = [dict(utils.RECIPE_PAYLOAD, tags=[tag.id])]
+
+        res = self.client.post(utils.RECIPES_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.data[0]["status"], status.HTTP_400_BAD_REQUEST)
+        self.assertIn("tags", res.data[0]["errors"])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_update_recipes(self):
+        """Test partially updating many recipes"""
+        recipe1 = utils.create_recipe(self.user)
+        recipe2 = utils.create_recipe(self.user)
+        recipe2.tags.add(utils.create_tag(self.user, "Spicy"))
+        recipe3 = utils.create_recipe(self.user2)
+        payload = [
+            {"id": recipe1.id, "title": "Updated"},
+            {"id": recipe2.id, "tags": [self.tag.id]},
+            {"id": recipe3.id, "title": "Not mine"},
+        ]
+
+        res = self.client.patch(
+            utils.RECIPES_BULK_URL, payload, format="json"
+        )
+
+        self.assertEqual(
+            [result["status"] for result in res.data],
+            [status.HTTP_200_OK, status.HTTP_200_OK,
+             status.HTTP_404_NOT_FOUND]
+        )
+        recipe1.refresh_from_db()
+        recipe3.refresh_from_db()
+        self.assertEqual(recipe1.title, "Updated")
+        self.assertEqual(list(recipe2.tags.all()), [self.tag])
+        self.assertNotEqual(recipe3.title, "Not mine")
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting many recipes"""
+        recipe1 = utils.create_recipe(self.user)
+        recipe2 = utils.create_recipe(self.user2)
+
+        res = self.client.delete(
+            utils.RECIPES_BULK_URL, [recipe1.id, recipe2.id], format="json"
+        )
+
+        self.assertEqual(
+            [result["status"] for result in res.data],
+            [status.HTTP_204_NO_CONTENT, status.HTTP_404_NOT_FOUND]
+        )
+        self.assertFalse(Recipe.objects.filter(id=recipe1.id).exists())
+        self.assertTrue(Recipe.objects.filter(id=recipe2.id).exists())
+
+    def test_bulk_requires_list(self):
+        """Test the bulk endpoint rejects a payload that is not a list"""
+        res = self.client.post(
+            utils.RECIPES_BULK_URL, utils.RECIPE_PAYLOAD, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_BULK_MAX_ITEMS=2)
+    def test_bulk_limits_items(self):
+        """Test the bulk endpoint rejects more items than allowed"""
+        payload = {
+            "title": "Recipe",
+            "time_minutes": 10,
+            "price": "5.00",
+            "tags": [],
+            "ingredients": [],
+        }
+
+        res = self.client.post(
+            utils.RECIPES_BULK_URL, [payload] * 3, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+        res = self.client.post(
+            utils.RECIPES_BULK_URL, [payload] * 2, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+
+class RecipeExportApiTests(TestCase):
+    """Test exporting recipes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = utils.create_user(**utils.USER_PAYLOAD)
+        self.client.force_authenticate(self.user)
+        self.tag = utils.create_tag(self.user, "Vegan")
+        self.ingredient = utils.create_ingredent(self.user, "Salt")
+
+    def _create_recipes(self, count):
+        for i in range(count):
+            recipe = utils.create_recipe(self.user, title=f"Recipe {i}")
+            recipe.tags.add(self.tag)
+            recipe.ingredients.add(self.ingredient)
+
+    def test_export_ndjson(self):
+        """Test exporting recipes as newline delimited JSON"""
+        self._create_recipes(3)
+        utils.create_recipe(
+            utils.create_user(**utils.USER_PAYLOAD_UPDATE)
+        )
+
+        res = self.client.get(utils.RECIPES_EXPORT_URL)
+        lines = b"".join(res.streaming_content).decode().splitlines()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0]), {
+            "id": Recipe.objects.get(title="Recipe 2").id,
+            "title": "Recipe 2",
+            "time_minutes": 10,
+            "price": "5.00",
+            "link": "",
+            "tags": ["Vegan"],
+            "ingredients": ["Salt"],
+        })
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV"""
+        self._create_recipes(2)
+
+        res = self.client.get(utils.RECIPES_EXPORT_URL, {"type": "csv"})
+        lines = b"".join(res.streaming_content).decode().splitlines()
+
+        self.assertEqual(res["Content-Type"], "text/csv")
+        self.assertEqual(
+            lines[0],
+            "id,title,time_minutes,price,link,tags,ingredients"
+        )
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].endswith(",Recipe 1,10,5.00,,Vegan,Salt"))
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=100)
+    def test_export_query_count(self):
+        """Test exporting prefetches related objects per chunk"""
+        self._create_recipes(10)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(utils.RECIPES_EXPORT_URL)
+            lines = b"".join(res.streaming_content).splitlines()
+
+        self.assertEqual(len(lines), 10)
+
+
 class RecipeImageUploadTests(TestCase):
 
     def setUp(self):
@@ -183,6 +549,42 @@ class RecipeImageUploadTests(TestCase):
         self.assertIn("image", res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    @patch("recipe.images.enqueue_variants")
+    def test_upload_image_enqueues_variants(self, mock_enqueue):
+        """Test uploading an image queues resizing without waiting"""
+        url = utils.image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+            img = Image.new("RGB", (10, 10))
+            img.save(ntf, format="JPEG")
+            ntf.seek(0)
+            res = self.client.post(url, {"image": ntf}, format="multipart")
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["image_variants"], {})
+        mock_enqueue.assert_called_once_with(self.recipe)
+
+    def test_generate_image_variants(self):
+        """Test resized variants are stored and exposed once ready"""
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+            Image.new("RGB", (2000, 1000)).save(ntf, format="JPEG")
+            ntf.seek(0)
+            self.recipe.image.save("photo.jpg", ntf)
+
+        images.generate_variants(self.recipe.id, self.recipe.image.name)
+        self.recipe.refresh_from_db()
+
+        variants = RecipeSerializer(self.recipe).data["image_variants"]
+        self.assertEqual(list(variants), ["128", "512", "1024"])
+        for size in variants:
+            path = os.path.join(
+                os.path.dirname(self.recipe.image.path),
+                os.path.basename(variants[size])
+            )
+            with Image.open(path) as variant:
+                self.assertEqual(variant.size[0], int(size))
+            os.remove(path)
+
     def test_upload_image_bad_request(self):
         """Test uploading an invalid image"""
         url = utils.image_upload_url(self.recipe.id)
@@ -190,6 +592,49 @@ class RecipeImageUploadTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_upload_image_too_large(self):
+        """Test uploading a file over the byte limit is rejected"""
+        url = utils.image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix=".bmp") as ntf:
+            Image.new("RGB", (100, 100)).save(ntf, format="BMP")
+            ntf.seek(0)
+            with override_settings(RECIPE_IMAGE_MAX_BYTES=1000):
+                res = self.client.post(
+                    url, {"image": ntf}, format="multipart"
+                )
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.assertFalse(self.recipe.image)
+
+    def test_upload_image_too_many_pixels(self):
+        """Test a decompression bomb is rejected from its header"""
+        def chunk(kind, data):
+            body = kind + data
+            return struct.pack(">I", len(data)) + body + \
+                struct.pack(">I", zlib.crc32(body))
+
+        header = struct.pack(">IIBBBBB", 30000, 30000, 8, 2, 0, 0, 0)
+        png = b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + \
+            chunk(b"IDAT", zlib.compress(b"\x00" * 1024 * 1024)) + \
+            chunk(b"IEND", b"")
+
+        url = utils.image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix=".png") as ntf:
+            ntf.write(png)
+            ntf.seek(0)
+            tracemalloc.start()
+            res = self.client.post(url, {"image": ntf}, format="multipart")
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("pixels", res.data["image"][0])
+        self.assertLess(peak, 10 * 1024 * 1024)
+
     def test_filter_recipes_by_tags(self):
         """Test returning recipes with specific tags"""
         recipe1 = utils.create_recipe(self.user)
@@ -211,9 +656,59 @@ class RecipeImageUploadTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertIn(serializer2.data, res.data["results"])
+        self.assertNotIn(serializer3.data, res.data["results"])
+
+    def test_filter_recipes_by_tags_unique(self):
+        """Test filtering by several matching tags returns unique recipes"""
+        recipe = utils.create_recipe(self.user)
+        tag1 = utils.create_tag(self.user, "Vegan")
+        tag2 = utils.create_tag(self.user, "Dessert")
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(
+            utils.RECIPES_URL,
+            {"tags": f"{tag1.id},{tag2.id}"},
+        )
+
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_filter_recipes_matching_all_tags(self):
+        """Test returning recipes that have all of the given tags"""
+        recipe1 = utils.create_recipe(self.user)
+        recipe2 = utils.create_recipe(self.user)
+        tag1 = utils.create_tag(self.user, "Vegan")
+        tag2 = utils.create_tag(self.user, "Dessert")
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag1)
+
+        res = self.client.get(
+            utils.RECIPES_URL,
+            {"tags": f"{tag1.id},{tag2.id}", "match": "all"},
+        )
+
+        self.assertEqual(
+            [recipe["id"] for recipe in res.data["results"]],
+            [recipe1.id]
+        )
+
+    def test_filter_recipes_invalid_match(self):
+        """Test filtering with an unknown match mode fails"""
+        res = self.client.get(
+            utils.RECIPES_URL,
+            {"tags": "1", "match": "some"},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_recipes_invalid_ids(self):
+        """Test filtering with IDs that are not integers fails"""
+        for params in ({"tags": "abc"}, {"ingredients": "1,1.5"}):
+            res = self.client.get(utils.RECIPES_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), res.data)
 
     def test_filter_recipes_by_ingredients(self):
         """Test returning recipes with specific ingredients"""
@@ -236,6 +731,48 @@ class RecipeImageUploadTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertIn(serializer2.data, res.data["results"])
+        self.assertNotIn(serializer3.data, res.data["results"])
+
+
+class RecipeQueryCountTests(TestCase):
+    """Test the number of queries used by the recipe API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = utils.create_user(**utils.USER_PAYLOAD)
+        self.client.force_authenticate(self.user)
+
+    def _create_recipes(self, count):
+        tag = utils.create_tag(self.user, "Vegan")
+        ingredient = utils.create_ingredent(self.user, "Salt")
+        for _ in range(count):
+            recipe = utils.create_recipe(self.user)
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+
+    def test_list_recipes_query_count(self):
+        """Test listing recipes uses a constant number of queries"""
+        self._create_recipes(2)
+        with self.assertNumQueries(3):
+            self.client.get(utils.RECIPES_URL)
+
+        self._create_recipes(10)
+        with self.assertNumQueries(3):
+            res = self.client.get(utils.RECIPES_URL)
+
+        self.assertEqual(len(res.data["results"]), 12)
+
+    def test_view_recipe_detail_query_count(self):
+        """Test viewing a recipe detail uses a constant number of queries"""
+        self._create_recipes(1)
+        recipe = Recipe.objects.get(user=self.user)
+        recipe.tags.add(utils.create_tag(self.user, "Dessert"))
+        recipe.ingredients.add(utils.create_ingredent(self.user, "Sugar"))
+
+        with self.assertNumQueries(3):
+            res = self.client.get(utils.recipe_detail_url(recipe.id))
+
+        self.assertEqual(len(res.data["tags"]), 2)
+        self.assertEqual(len(res.data["ingredients"]), 2)
@@ -0,0 +1,128 @@
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import stats
+from core.models import Recipe
+
+import app.utils as utils
+
+
+class PublicStatsApiTests(TestCase):
+    """Test unauthenticated recipe statistics API access"""
+
+    def test_auth_required(self):
+        """Test that authentication is required"""
+        res = APIClient().get(utils.RECIPE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateStatsApiTests(TestCase):
+    """Test the maintained recipe statistics"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = utils.create_user(**utils.USER_PAYLOAD)
+        self.user2 = utils.create_user(**utils.USER_PAYLOAD_UPDATE)
+        self.client.force_authenticate(self.user)
+        self.vegan = utils.create_tag(self.user, "Vegan")
+        self.dessert = utils.create_tag(self.user, "Dessert")
+        self.salt = utils.create_ingredent(self.user, "Salt")
+
+    def assertConsistent(self):
+        self.assertEqual(stats.differences(self.user.id), {})
+
+    def test_retrieve_stats(self):
+        """Test the statistics summarize the user's recipes"""
+        recipe = utils.create_recipe(self.user, time_minutes=10, price=4)
+        recipe.tags.add(self.vegan, self.dessert)
+        recipe = utils.create_recipe(self.user, time_minutes=20, price=12)
+        recipe.tags.add(self.vegan)
+        recipe.ingredients.add(self.salt)
+        utils.create_recipe(self.user2, price=60)
+
+        res = self.client.get(utils.RECIPE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["recipes"], 2)
+        self.assertEqual(res.data["average_time_minutes"], 15)
+        self.assertEqual(str(res.data["average_price"]), "8.00")
+        self.assertEqual(
+            [row["recipes"] for row in res.data["price_ranges"]],
+            [1, 0, 1, 0, 0],
+        )
+        self.assertEqual(
+            [(tag["name"], tag["recipes"]) for tag in res.data["tags"]],
+            [("Dessert", 1), ("Vegan", 2)],
+        )
+        self.assertEqual(res.data["ingredients"][0]["recipes"], 1)
+
+    def test_stats_follow_api_changes(self):
+        """Test that creating, updating and deleting keep stats exact"""
+        res = self.client.post(utils.RECIPES_URL, {
+            "title": "Cake", "time_minutes": 30, "price": "5.00",
+            "tags": [self.vegan.id, self.dessert.id],
+        })
+        recipe_id = res.data["id"]
+        self.assertConsistent()
+
+        self.client.patch(utils.recipe_detail_url(recipe_id), {
+            "price": "25.00", "tags": [self.dessert.id],
+        })
+        self.assertConsistent()
+
+        self.client.delete(utils.recipe_detail_url(recipe_id))
+        self.assertConsistent()
+        self.assertEqual(stats.stored(self.user.id)["recipes"], 0)
+
+    def test_stats_follow_relation_changes(self):
+        """Test that m2m changes from either side keep stats exact"""
+        recipe = utils.create_recipe(self.user)
+        recipe.tags.add(self.vegan)
+        recipe.tags.remove(self.vegan, self.dessert)
+        self.assertConsistent()
+
+        self.dessert.recipe_set.add(recipe)
+        self.dessert.recipe_set.remove(recipe)
+        recipe.ingredients.add(self.salt)
+        recipe.tags.add(self.vegan, self.dessert)
+        self.assertConsistent()
+
+        recipe.tags.clear()
+        self.salt.recipe_set.clear()
+        self.assertConsistent()
+
+        recipe.tags.add(self.vegan)
+        self.vegan.delete()
+        self.assertConsistent()
+
+    def test_stats_follow_bulk_changes(self):
+        """Test that bulk writes keep stats exact"""
+        payload = [
+            {"title": f"Recipe {i}", "time_minutes": 10, "price": "5.00",
+             "tags": [self.vegan.id], "ingredients": [self.salt.id]}
+            for i in range(3)
+        ]
+        res = self.client.post(utils.RECIPES_BULK_URL, payload, format="json")
+        ids = [result["data"]["id"] for result in res.data]
+        self.assertConsistent()
+
+        self.client.patch(utils.RECIPES_BULK_URL, [
+            {"id": ids[0], "price": "50.00", "tags": [self.dessert.id]},
+        ], format="json")
+        self.assertConsistent()
+
+        self.client.delete(utils.RECIPES_BULK_URL, ids[1:], format="json")
+        self.assertConsistent()
+
+    def test_user_deleted_with_stats(self):
+        """Test deleting a user removes their statistics"""
+        recipe = utils.create_recipe(self.user)
+        recipe.tags.add(self.vegan)
+
+        self.user.delete()
+
+        self.assertFalse(Recipe.objects.exists())
+        self.assertEqual(stats.stored(self.user.id)["counts"], {})
@@ -1,8 +1,10 @@
-from django.test import TestCase
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core.cache import get_user_version, user_cache_key, set_user_cache
 from core.models import Tag
 
 from recipe.serializers import TagSerializer
@@ -41,7 +43,7 @@ class PrivateTagsApiTests(TestCase):
 
         serializer = TagSerializer(utils.all_tags(), many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test that tags returned are for the authenticated user"""
@@ -51,8 +53,28 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(utils.TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["name"], tag.name)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["name"], tag.name)
+
+    def test_tags_paginated_by_cursor(self):
+        """Test paging through tags with the next cursor"""
+        for name in ("Breakfast", "Lunch", "Dinner"):
+            utils.create_tag(self.user, name)
+
+        res = self.client.get(utils.TAGS_URL, {"page_size": 2})
+
+        self.assertEqual(
+            [tag["name"] for tag in res.data["results"]],
+            ["Lunch", "Dinner"]
+        )
+
+        res = self.client.get(res.data["next"])
+
+        self.assertEqual(
+            [tag["name"] for tag in res.data["results"]],
+            ["Breakfast"]
+        )
+        self.assertIsNone(res.data["next"])
 
     def test_create_tag_successful(self):
         """Test create a new tag"""
@@ -82,11 +104,12 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(utils.TAGS_URL, {"assigned_only": 1})
 
+        tag1.refresh_from_db()
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertNotIn(serializer2.data, res.data["results"])
 
     def test_retrieve_tags_assigned_unique(self):
         """Test filtering tags by assigned returns unique items"""
@@ -101,4 +124,154 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(utils.TAGS_URL, {"assigned_only": 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_tags_list_cached(self):
+        """Test the tags list is served from cache until a tag changes"""
+        utils.create_tag(self.user, "Vegan")
+        self.client.get(utils.TAGS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(utils.TAGS_URL)
+
+        self.assertEqual(len(res.data["results"]), 1)
+
+        utils.create_tag(self.user, "Dessert")
+        res = self.client.get(utils.TAGS_URL)
+
+        self.assertEqual(len(res.data["results"]), 2)
+
+    def test_assigned_tags_cache_invalidated(self):
+        """Test assigning a tag to a recipe invalidates the cached list"""
+        tag = utils.create_tag(self.user, "Vegan")
+        recipe = utils.create_recipe(self.user)
+        res = self.client.get(utils.TAGS_URL, {"assigned_only": 1})
+
+        self.assertEqual(len(res.data["results"]), 0)
+
+        recipe.tags.add(tag)
+        res = self.client.get(utils.TAGS_URL, {"assigned_only": 1})
+
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_tags_list_not_modified(self):
+        """Test a tags list request with a current ETag returns 304"""
+        utils.create_tag(self.user, "Vegan")
+        res = self.client.get(utils.TAGS_URL)
+
+        res = self.client.get(utils.TAGS_URL, HTTP_IF_NONE_MATCH=res["ETag"])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        res = self.client.get(
+            utils.TAGS_URL,
+            {"assigned_only": 1},
+            HTTP_IF_NONE_MATCH=res["ETag"]
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_tag_recipe_count_maintained(self):
+        """Test the recipe count of a tag follows its recipes"""
+        tag = utils.create_tag(self.user, "Vegan")
+        recipe1 = utils.create_recipe(self.user, **utils.RECIPE_PAYLOAD)
+        recipe2 = utils.create_recipe(self.user, **utils.RECIPE_PAYLOAD_UPDATE)
+
+        recipe1.tags.add(tag)
+        tag.recipe_set.add(recipe1, recipe2)
+        tag.refresh_from_db()
+
+        self.assertEqual(tag.recipe_count, 2)
+
+        recipe1.tags.remove(tag)
+        recipe2.delete()
+        tag.refresh_from_db()
+
+        self.assertEqual(tag.recipe_count, 0)
+
+    def test_retrieve_tags_ordered_by_recipe_count(self):
+        """Test tags can be listed most used first"""
+        tag1 = utils.create_tag(self.user, "Vegan")
+        tag2 = utils.create_tag(self.user, "Lunch")
+        utils.create_recipe(self.user).tags.add(tag1, tag2)
+        utils.create_recipe(self.user).tags.add(tag2)
+
+        res = self.client.get(utils.TAGS_URL, {"ordering": "recipe_count"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(tag["id"], tag["recipe_count"]) for tag in res.data["results"]],
+            [(tag2.id, 2), (tag1.id, 1)]
+        )
+
+    def test_tags_by_recipe_count_paginated_with_ties(self):
+        """Test paging through equally used tags visits each once"""
+        tags = [utils.create_tag(self.user, f"Tag {i}") for i in range(5)]
+        expected = [tag.id for tag in tags]
+
+        ids, url = [], utils.TAGS_URL
+        params = {"ordering": "recipe_count", "page_size": 2}
+        for _ in range(len(tags)):
+            res = self.client.get(url, params)
+            ids += [tag["id"] for tag in res.data["results"]]
+            url, params = res.data["next"], None
+            if url is None:
+                break
+
+        self.assertEqual(ids, expected)
+
+        res = self.client.get(res.data["previous"])
+
+        self.assertEqual(
+            [tag["id"] for tag in res.data["results"]], expected[2:4]
+        )
+
+    def test_retrieve_tags_invalid_ordering(self):
+        """Test listing tags with an unknown ordering fails"""
+        res = self.client.get(utils.TAGS_URL, {"ordering": "user"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_tags_invalid_assigned_only(self):
+        """Test listing tags with a non integer assigned_only fails"""
+        res = self.client.get(utils.TAGS_URL, {"assigned_only": "x"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("assigned_only", res.data)
+
+
+class TagsCacheTransactionTests(TransactionTestCase):
+    """Test the cached tags list around committed transactions"""
+
+    def setUp(self):
+        self.user = utils.create_user(**utils.USER_PAYLOAD)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_cached_during_write_not_served_after_commit(self):
+        """Test a list cached while a write is uncommitted is replaced"""
+        utils.create_tag(self.user, "Vegan")
+        before = self.client.get(utils.TAGS_URL).data
+
+        with transaction.atomic():
+            utils.create_tag(self.user, "Dessert")
+            version = get_user_version(self.user.id)
+            # A concurrent request only sees the committed tag and caches
+            # it under the version current inside the transaction
+            set_user_cache(user_cache_key(self.user.id, "core.tag"), before)
+
+        res = self.client.get(utils.TAGS_URL)
+
+        self.assertNotEqual(get_user_version(self.user.id), version)
+        self.assertEqual(len(res.data["results"]), 2)
+
+    def test_etag_during_write_not_matched_after_commit(self):
+        """Test an ETag handed out before a write commits is not reused"""
+        with transaction.atomic():
+            utils.create_tag(self.user, "Vegan")
+            etag = self.client.get(utils.TAGS_URL)["ETag"]
+
+        res = self.client.get(utils.TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 1)
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler, \
+                                            SkipFile
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import serializers
+
+
+class MaxSizeUploadHandler(TemporaryFileUploadHandler):
+    """Spool uploads to disk in chunks, skipping files over the size limit
+
+    A skipped upload is flagged on the request as ``upload_too_large``.
+    """
+
+    def __init__(self, request=None, max_bytes=None):
+        super().__init__(request)
+        self.max_bytes = max_bytes or settings.RECIPE_IMAGE_MAX_BYTES
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_bytes:
+            self.request.upload_too_large = True
+            raise SkipFile()
+
+        return super().receive_data_chunk(raw_data, start)
+
+
+class BoundedImageField(serializers.ImageField):
+    """Image field that checks size and dimensions before decoding"""
+    default_error_messages = {
+        "too_large": _(
+            "Image files may not be larger than {max_bytes} bytes."
+        ),
+        "too_many_pixels": _(
+            "Images may not have more than {max_pixels} pixels."
+        ),
+    }
+
+    def to_internal_value(self, data):
+        """Reject images by their header before Pillow decodes them"""
+        from PIL import Image
+
+        max_bytes = settings.RECIPE_IMAGE_MAX_BYTES
+        max_pixels = settings.RECIPE_IMAGE_MAX_PIXELS
+
+        if getattr(data, "size", 0) > max_bytes:
+            self.fail("too_large", max_bytes=max_bytes)
+
+        if hasattr(data, "seek"):
+            try:
+                width, height = Image.open(data).size
+            except Image.DecompressionBombError:
+                self.fail("too_many_pixels", max_pixels=max_pixels)
+            except Exception:
+                self.fail("invalid_image")
+            finally:
+                data.seek(0)
+
+            if width * height > max_pixels:
+                self.fail("too_many_pixels", max_pixels=max_pixels)
+
+        return super().to_internal_value(data)
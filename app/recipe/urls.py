@@ -12,5 +12,6 @@ router.register("recipes", views.RecipeViewSet)
 app_name = "recipe"
 
 urlpatterns = [
-    path("", include(router.urls))
+    path("stats/", views.RecipeStatsView.as_view(), name="stats"),
+    path("", include(router.urls)),
 ]
@@ -1,34 +1,76 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Prefetch
+from django.http import StreamingHttpResponse
+from django.utils.translation import ugettext_lazy as _
+
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+
+from core import stats
 
+from core.authentication import CachedTokenAuthentication
 from core.models import Tag, Ingredient, Recipe
+from core.search import search_recipes
+from core.views import IgnoreClientContentNegotiation
 
-from recipe import serializers
+from recipe import serializers, bulk, images, exports
+from recipe.mixins import CachedListMixin, ConditionalListMixin, \
+                          ConditionalRetrieveMixin
+from recipe.pagination import RecipeCursorPagination, \
+                              RecipeSearchCursorPagination, \
+                              RecipeAttrCursorPagination, \
+                              RecipeAttrCountCursorPagination
+from recipe.uploads import MaxSizeUploadHandler
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+class BaseRecipeAttrViewSet(ConditionalListMixin,
+                            CachedListMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base viewset for user owned recipe attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeAttrCursorPagination
+    orderings = {
+        "name": RecipeAttrCursorPagination,
+        "recipe_count": RecipeAttrCountCursorPagination,
+    }
+
+    @property
+    def paginator(self):
+        """Return the paginator for the requested ordering"""
+        if not hasattr(self, "_paginator"):
+            ordering = self.request.query_params.get("ordering", "name")
+            if ordering not in self.orderings:
+                raise ValidationError({
+                    "ordering": [_('Must be "name" or "recipe_count".')]
+                })
+            self._paginator = self.orderings[ordering]()
+
+        return self._paginator
 
     def get_queryset(self):
         """Return objects for the current authenticated user"""
-        assigned_only = bool(
-            int(self.request.query_params.get("assigned_only", 0))
+        assigned_only = bulk.parse_pk(
+            self.request.query_params.get("assigned_only", "0")
         )
+        if assigned_only is None:
+            raise ValidationError({
+                "assigned_only": [_("Must be an integer.")]
+            })
+
         queryset = self.queryset
 
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.filter(recipe_count__gt=0)
 
-        return queryset.filter(
-            user=self.request.user
-        ).order_by("-name").distinct()
+        return queryset.filter(user=self.request.user)
 
     def perform_create(self, serializer):
         """Create a new object"""
@@ -47,33 +89,101 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializers.IngredientSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalListMixin,
+                    ConditionalRetrieveMixin,
+                    viewsets.ModelViewSet):
     """Manage recipes in the database"""
     queryset = Recipe.objects.all()
     serializer_class = serializers.RecipeSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeCursorPagination
+
+    @property
+    def paginator(self):
+        """Return the paginator, ordering search results by rank"""
+        if not hasattr(self, "_paginator"):
+            if self.request.query_params.get("search"):
+                self._paginator = RecipeSearchCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+
+        return self._paginator
 
-    def _params_to_ints(self, qs):
+    def _params_to_ints(self, qs, param):
         """Convert a list of string IDs to a list of integers"""
-        return [int(str_id) for str_id in qs.split(",")]
+        ids = [bulk.parse_pk(str_id.strip()) for str_id in qs.split(",")]
+        if None in ids:
+            raise ValidationError({
+                param: [_("Must be a comma separated list of IDs.")]
+            })
+
+        return ids
+
+    def _filter_related(self, queryset, field_name, ids, match):
+        """Filter recipes related to any or all of the given IDs"""
+        field = getattr(Recipe, field_name).field
+        related = field.remote_field.through.objects.filter(
+            **{f"{field.m2m_reverse_field_name()}__in": ids}
+        )
+
+        if match == "all":
+            matching = related.values("recipe_id").annotate(
+                matches=Count("id")
+            ).filter(matches=len(set(ids))).values("recipe_id")
+
+            return queryset.filter(id__in=matching)
+
+        annotation = f"has_{field_name}"
+        return queryset.annotate(**{
+            annotation: Exists(related.filter(recipe_id=OuterRef("pk")))
+        }).filter(**{annotation: True})
 
     def get_queryset(self):
         """Retrieve the recipes for the autheticated user"""
         tags = self.request.query_params.get("tags")
         ingredients = self.request.query_params.get("ingredients")
+        match = self.request.query_params.get("match", "any")
+        search = self.request.query_params.get("search")
         queryset = self.queryset
 
+        if match not in ("any", "all"):
+            raise ValidationError({"match": [_('Must be "any" or "all".')]})
+
         if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            tag_ids = self._params_to_ints(tags, "tags")
+            queryset = self._filter_related(queryset, "tags", tag_ids, match)
 
         if ingredients:
-            ingredients_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_ids)
+            ingredients_ids = self._params_to_ints(
+                ingredients, "ingredients"
+            )
+            queryset = self._filter_related(
+                queryset, "ingredients", ingredients_ids, match
+            )
+
+        if search:
+            queryset = search_recipes(queryset, self.request.user, search)
+
+        queryset = self._prefetch_for_action(queryset)
 
         return queryset.filter(user=self.request.user)
 
+    def _prefetch_for_action(self, queryset):
+        """Prefetch the related objects the action's serializer renders"""
+        if self.action in ("list", "update", "partial_update", "bulk"):
+            return queryset.prefetch_related(
+                Prefetch("tags", queryset=Tag.objects.only("id")),
+                Prefetch(
+                    "ingredients",
+                    queryset=Ingredient.objects.only("id")
+                ),
+            )
+        elif self.action == "retrieve":
+            return queryset.prefetch_related("tags", "ingredients")
+
+        return queryset
+
     def get_serializer_class(self):
         """Return appropriate serializer class"""
         if self.action == "retrieve":
@@ -89,15 +199,25 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(methods=["POST"], detail=True, url_path="upload-image")
     def upload_image(self, request, pk=None):
-        """Upload an image to a recipe"""
+        """Upload an image to a recipe and resize it in the background"""
+        request._request.upload_handlers = [
+            MaxSizeUploadHandler(request._request)
+        ]
         recipe = self.get_object()
         serializer = self.get_serializer(
             recipe,
             data=request.data
         )
 
+        if getattr(request._request, "upload_too_large", False):
+            return Response(
+                {"image": [_("Image file is too large.")]},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
         if serializer.is_valid():
-            serializer.save()
+            recipe = serializer.save(image_variants="")
+            images.enqueue_variants(recipe)
 
             return Response(
                 serializer.data,
@@ -108,3 +228,181 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        content_negotiation_class=IgnoreClientContentNegotiation
+    )
+    def export(self, request):
+        """Stream all of the user's recipes as NDJSON or CSV
+
+        The recipes are queried while the response is sent, inside the
+        replica, slow query and metrics scopes the middleware keeps open
+        for streaming responses.
+        """
+        export_type = request.query_params.get("type", "ndjson")
+        if export_type not in ("ndjson", "csv"):
+            raise ValidationError({"type": [_('Must be "ndjson" or "csv".')]})
+
+        rows = exports.export_rows(
+            self.get_queryset().order_by("-id"),
+            settings.RECIPE_EXPORT_CHUNK_SIZE
+        )
+        if export_type == "csv":
+            response = StreamingHttpResponse(
+                exports.csv_lines(rows), content_type="text/csv"
+            )
+        else:
+            response = StreamingHttpResponse(
+                exports.ndjson_lines(rows),
+                content_type="application/x-ndjson"
+            )
+        response["Content-Disposition"] = \
+            f'attachment; filename="recipes.{export_type}"'
+
+        return response
+
+    def _bulk_serializer(self, related_objects, *args, **kwargs):
+        """Return a serializer that reuses the resolved related objects"""
+        context = self.get_serializer_context()
+        context["related_objects"] = related_objects
+
+        return serializers.RecipeSerializer(*args, context=context, **kwargs)
+
+    def _bulk_data(self, recipes):
+        """Serialize the written recipes with a constant number of queries"""
+        queryset = self._prefetch_for_action(
+            Recipe.objects.filter(id__in=[recipe.id for recipe in recipes])
+        )
+        data = {
+            recipe.id: serializers.RecipeSerializer(recipe).data
+            for recipe in queryset
+        }
+
+        return [data[recipe.id] for recipe in recipes]
+
+    def _bulk_create(self, items):
+        """Validate all items and create the valid ones in bulk"""
+        related_objects = bulk.resolve_related_objects(
+            self.request.user, items
+        )
+        results, indexes, valid = [], [], []
+        for index, item in enumerate(items):
+            serializer = self._bulk_serializer(related_objects, data=item)
+            if serializer.is_valid():
+                indexes.append(index)
+                valid.append(serializer.validated_data)
+                results.append(None)
+            else:
+                results.append({
+                    "status": status.HTTP_400_BAD_REQUEST,
+                    "errors": serializer.errors,
+                })
+
+        recipes = bulk.bulk_create_recipes(self.request.user, valid)
+        for index, data in zip(indexes, self._bulk_data(recipes)):
+            results[index] = {"status": status.HTTP_201_CREATED, "data": data}
+
+        return results
+
+    def _bulk_update(self, items):
+        """Validate all items and partially update the valid ones in bulk"""
+        related_objects = bulk.resolve_related_objects(
+            self.request.user, items
+        )
+        instances = Recipe.objects.filter(user=self.request.user).in_bulk([
+            item.get("id") for item in items
+            if isinstance(item, dict) and isinstance(item.get("id"), int)
+        ])
+        results, indexes, valid = [], [], []
+        for index, item in enumerate(items):
+            recipe = None
+            if isinstance(item, dict):
+                recipe = instances.get(item.get("id"))
+            if recipe is None:
+                results.append({
+                    "status": status.HTTP_404_NOT_FOUND,
+                    "errors": {"id": [_("Recipe not found.")]},
+                })
+                continue
+
+            serializer = self._bulk_serializer(
+                related_objects, recipe, data=item, partial=True
+            )
+            if serializer.is_valid():
+                indexes.append(index)
+                valid.append((recipe, serializer.validated_data))
+                results.append(None)
+            else:
+                results.append({
+                    "status": status.HTTP_400_BAD_REQUEST,
+                    "errors": serializer.errors,
+                })
+
+        recipes = bulk.bulk_update_recipes(self.request.user, valid)
+        for index, data in zip(indexes, self._bulk_data(recipes)):
+            results[index] = {"status": status.HTTP_200_OK, "data": data}
+
+        return results
+
+    def _bulk_delete(self, items):
+        """Delete the recipes with the given IDs in one query"""
+        queryset = Recipe.objects.filter(
+            user=self.request.user,
+            id__in=[item for item in items if isinstance(item, int)]
+        )
+        existing = set(queryset.values_list("id", flat=True))
+        queryset.delete()
+
+        return [
+            {"status": status.HTTP_204_NO_CONTENT, "id": item}
+            if item in existing else
+            {"status": status.HTTP_404_NOT_FOUND, "id": item}
+            for item in items
+        ]
+
+    @action(methods=["POST", "PATCH", "DELETE"], detail=False)
+    def bulk(self, request):
+        """Create, update or delete many recipes in one request
+
+        POST takes a list of recipes, PATCH a list of partial recipes with
+        their ``id`` and DELETE a list of recipe IDs, each at most
+        ``RECIPE_BULK_MAX_ITEMS`` long. The response holds a result with a
+        status for every item, in the order submitted.
+        """
+        if not isinstance(request.data, list):
+            return Response(
+                {"detail": _("Expected a list of items.")},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(request.data) > settings.RECIPE_BULK_MAX_ITEMS:
+            return Response(
+                {"detail": _(
+                    "Expected at most {max_items} items, got {count}."
+                ).format(
+                    max_items=settings.RECIPE_BULK_MAX_ITEMS,
+                    count=len(request.data),
+                )},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        handlers = {
+            "POST": self._bulk_create,
+            "PATCH": self._bulk_update,
+            "DELETE": self._bulk_delete,
+        }
+        with transaction.atomic():
+            results = handlers[request.method](request.data)
+
+        return Response(results, status=status.HTTP_200_OK)
+
+
+class RecipeStatsView(APIView):
+    """Statistics of the authenticated user's recipes"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        """Return the maintained statistics without scanning recipes"""
+        return Response(stats.summary(request.user))